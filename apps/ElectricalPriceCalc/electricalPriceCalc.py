@@ -8,12 +8,26 @@ __version__ = "0.1.7"
 from appdaemon import adbase as ad
 import datetime
 import math
-import bisect
+import numbers
+import threading
 from nordpool import elspot
 from geopy.geocoders import Nominatim
 import holidays
+import uuid
+from zoneinfo import ZoneInfo
 from typing import List, Tuple
-from pydantic_models_price import PeakHour, PriceHour
+from pydantic_models_price import PeakHour, PriceHour, LoadProfileCost
+from price_vectors import slot_energy_prices, cost_of_load_profiles, peak_mask, spend_mask
+from price_slots import PriceSlots, split_price_hours, duration_between, hours_between
+from price_ingest import PriceSeries, spot_records, integration_records, fixed_price_records
+from price_index import PriceThresholdIndex
+from price_snapshot import PriceSnapshot
+from price_windows import CheapestWindowTable
+from save_planner import plan_save_slots
+from price_statistics import PriceStatistics
+from save_sessions import SaveHoursSession
+from sensor_publisher import SensorPublisher
+from query_server import QueryServer
 
 
 class ElectricalPriceCalc(ad.ADBase):
@@ -49,14 +63,31 @@ class ElectricalPriceCalc(ad.ADBase):
         self.power_support_above:float = self.args.get('power_support_above', 10)
         self.support_amount:float = self.args.get('support_amount', 0)
 
-        self.elpricestoday:list = []
-        self.sorted_elprices_today:list = []
-        self.sorted_elprices_tomorrow:list = []
-        self.todayslength:int = 0
-        self.tomorrow_valid = True
+        # Published prices. Queries read the snapshot once and use only that.
+        self._snapshot = PriceSnapshot(price_hours = [], todayslength = 0, tomorrow_valid = True)
+
+        # Notifications to other apps on new prices, slot change and price thresholds
+        self._price_listeners:dict = {}
+        self._slot_timer = None
+        self.price_events:bool = self.args.get('price_events', False)
+        self.price_event_thresholds:list = self.args.get('price_event_thresholds', [])
+        self._event_threshold_above:dict = {}
+
+        # Save hours sessions per consumer, also created from the query server thread
+        self._save_sessions:dict = {}
+        self._save_sessions_lock = threading.Lock()
+
+        # Publish prices and schedules to Home Assistant sensors
+        self.sensor_publisher = None
+        if self.args.get('publish_sensors', False):
+            sensor_options = self.args['publish_sensors'] if isinstance(self.args['publish_sensors'], dict) else {}
+            self.sensor_publisher = SensorPublisher(app = self, **sensor_options)
+            self.listen_prices(self.sensor_publisher.publish)
+            self.listen_slot_change(self.sensor_publisher.publish)
 
         if 'fixedprice' in self.args:
             fixedprice = self.args['fixedprice']
+            self.resolution:int = self.args.get('resolution', 60)
             self.currency = self.args.get('currency', 'EUR')
             self.VAT = self.args.get('VAT', 0)
             if self.ADapi.now_is_between('12:50:00', '23:59:59'):
@@ -92,6 +123,46 @@ class ElectricalPriceCalc(ad.ADBase):
                     )
                     break
 
+        # Local query server for consumers outside AppDaemon
+        self.query_server = None
+        if self.args.get('query_server', False):
+            server_options = self.args['query_server'] if isinstance(self.args['query_server'], dict) else {}
+            self.query_server = QueryServer(app = self, **server_options)
+            self.query_server.start()
+
+    def terminate(self) -> None:
+        if self.query_server is not None:
+            self.query_server.stop()
+
+    # Published prices from the current snapshot, for other apps
+    @property
+    def elpricestoday(self) -> list:
+        return self._snapshot.elpricestoday
+
+    @property
+    def todayslength(self) -> int:
+        return self._snapshot.todayslength
+
+    @property
+    def sorted_elprices_today(self) -> list:
+        return self._snapshot.sorted_elprices_today
+
+    @property
+    def sorted_elprices_tomorrow(self) -> list:
+        return self._snapshot.sorted_elprices_tomorrow
+
+    @property
+    def tomorrow_valid(self) -> bool:
+        return self._snapshot.tomorrow_valid
+
+    @property
+    def slots(self) -> PriceSlots:
+        return self._snapshot.slots
+
+    @property
+    def price_index(self) -> PriceThresholdIndex:
+        return self._snapshot.price_index
+
     def _update_price_rundaily(self, entity, attribute, old, new, kwargs) -> None:
         self._fetchNordpoolPrices(0)
 
@@ -99,6 +170,7 @@ class ElectricalPriceCalc(ad.ADBase):
     def _fetchNordpoolSpotPrices(self, kwargs) -> None:
         nordpool_todays_prices:list = []
         nordpool_tomorrow_prices:list = []
+        local_tz = datetime.datetime.now().astimezone().tzinfo
         try:
             todays_prices = self.prices_spot.fetch(
                 end_date=datetime.date.today(),
@@ -110,7 +182,9 @@ class ElectricalPriceCalc(ad.ADBase):
             self.ADapi.run_in(self._fetchNordpoolSpotPrices, 1800)
             return
         else:
-            nordpool_todays_prices = self._correctDictsNordpoolSpotPrices(nordpool_prices = todays_prices['areas'][self.pricearea]['values'])
+            nordpool_todays_prices = spot_records(values = todays_prices['areas'][self.pricearea]['values'],
+                                                  vat = self.VAT,
+                                                  tz = local_tz)
         try:
             tomorrow_prices = self.prices_spot.fetch(
                 areas=[self.pricearea],
@@ -121,7 +195,9 @@ class ElectricalPriceCalc(ad.ADBase):
             self.ADapi.run_in(self._fetchNordpoolSpotPrices, 1800)
         else:
             if tomorrow_prices is not None:
-                nordpool_tomorrow_prices = self._correctDictsNordpoolSpotPrices(nordpool_prices = tomorrow_prices['areas'][self.pricearea]['values'])
+                nordpool_tomorrow_prices = spot_records(values = tomorrow_prices['areas'][self.pricearea]['values'],
+                                                        vat = self.VAT,
+                                                        tz = local_tz)
             elif self.ADapi.datetime(aware=True) > self.ADapi.parse_datetime('13:00:00', today = True, aware=True):
                 self.ADapi.run_in(self._fetchNordpoolSpotPrices, 600)
                 return
@@ -129,14 +205,6 @@ class ElectricalPriceCalc(ad.ADBase):
         self._calculatePrices(nordpool_todays_prices = nordpool_todays_prices,
                               nordpool_tomorrow_prices = nordpool_tomorrow_prices)
         
-    def _correctDictsNordpoolSpotPrices(self, nordpool_prices):
-        local_tz = datetime.datetime.now().astimezone().tzinfo
-        for item in nordpool_prices:
-            item['value'] = (float(item['value']) / 1000) * self.VAT # convert price from pr mega to kilo and adds VAT
-            item['start'] = item['start'].astimezone(local_tz)
-            item['end'] = item['end'].astimezone(local_tz)
-        return nordpool_prices
-
     # Fetch Nordpool prices with Home Assistant integration
     def _fetchNordpoolPrices(self, kwargs) -> None:
         nordpool_todays_prices:list = []
@@ -151,7 +219,7 @@ class ElectricalPriceCalc(ad.ADBase):
             self.ADapi.run_in(self._fetchNordpoolPrices, 1800)
             return
         else:
-            nordpool_todays_prices = self._correctDictsNordpoolIntegrationPrices(nordpool_prices = todays_prices)
+            nordpool_todays_prices = integration_records(values = todays_prices, convert_utc = self.ADapi.convert_utc)
 
         # Tomorrows prices if available
         if self.ADapi.get_state(entity_id = self.nordpool_prices, attribute = 'tomorrow_valid'):
@@ -166,63 +234,50 @@ class ElectricalPriceCalc(ad.ADBase):
                     len(tomorrow_prices) > 0
                     and todays_prices != tomorrow_prices
                 ):
-                    nordpool_tomorrow_prices = self._correctDictsNordpoolIntegrationPrices(nordpool_prices = tomorrow_prices)
+                    nordpool_tomorrow_prices = integration_records(values = tomorrow_prices, convert_utc = self.ADapi.convert_utc)
 
         self._calculatePrices(nordpool_todays_prices = nordpool_todays_prices,
                               nordpool_tomorrow_prices = nordpool_tomorrow_prices)
 
-    def _correctDictsNordpoolIntegrationPrices(self, nordpool_prices):
-        for item in nordpool_prices:
-            item['start'] = self.ADapi.convert_utc(item['start'])
-            item['end'] = self.ADapi.convert_utc(item['end'])
-        return nordpool_prices
-
     def _create_daily_prices_with_taxes(self, **kwargs) -> None:
         price = kwargs['price']
         tomorrow = kwargs['tomorrow']
-        nordpool_todays_prices:list = self.create_time_slots(today=True, price = price)
+        nordpool_todays_prices:list = list(self._fixed_price_records(today=True, price = price))
         if tomorrow:
-            nordpool_tomorrow_prices:list = self.create_time_slots(today=False, price = price)
+            nordpool_tomorrow_prices:list = list(self._fixed_price_records(today=False, price = price))
         else:
             nordpool_tomorrow_prices:list = []
 
         self._calculatePrices(nordpool_todays_prices = nordpool_todays_prices,
                               nordpool_tomorrow_prices = nordpool_tomorrow_prices)
 
-    def create_time_slots(self, today, price):
-        now = self.ADapi.datetime(aware=True)
-        tz  = now.tzinfo
+    def create_time_slots(self, today, price) -> list:
+        """ Returns slots for today or tomorrow with fixed price as dicts with start, end and value. """
 
-        if today:
-            start_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        else:
-            start_day = (now + datetime.timedelta(days=1)).replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
+        return [{'start': start, 'end': end, 'value': value}
+                for start, end, value in self._fixed_price_records(today = today, price = price)]
 
-        end_day = start_day + datetime.timedelta(days=1)
+    def _fixed_price_records(self, today, price):
+        """ Yields start, end and price records for today or tomorrow with fixed price. """
 
-        slots = []
-        cur = start_day
-        while cur < end_day:
-            nxt = cur + datetime.timedelta(hours=1)
+        tz = ZoneInfo(self.ADapi.get_timezone())
+        day = self.ADapi.datetime(aware=True).astimezone(tz).date()
+        if not today:
+            day += datetime.timedelta(days=1)
 
-            slots.append({
-                "start": cur,
-                "end":   nxt,
-                "value": price,
-            })
-            cur = nxt
+        start_day = datetime.datetime.combine(day, datetime.time(0), tzinfo=tz)
+        end_day = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time(0), tzinfo=tz)
 
-        return slots
+        return fixed_price_records(start_day = start_day,
+                                   end_day = end_day,
+                                   minutes = getattr(self, 'resolution', 60),
+                                   price = price)
 
     # Calculates taxes and adjusts datetime
     def _calculatePrices(self,
                          nordpool_todays_prices,
                          nordpool_tomorrow_prices):
-        self.sorted_elprices_today = []
-        self.sorted_elprices_tomorrow = []
-        self.elpricestoday = []
+        """ Reads start, end and kWh price records for today and tomorrow into prices with taxes in one pass. """
 
         isNotWorkday:bool = self._is_holiday(datetime.date.today())
         if not isNotWorkday:
@@ -231,72 +286,82 @@ class ElectricalPriceCalc(ad.ADBase):
         aftertwentytwo = self.ADapi.parse_datetime("22:00:00", today = True, aware=True)
 
         # Todays prices
-        self.sorted_elprices_today = self._doCalculationPricesInclVat(nordpool_prices = nordpool_todays_prices,
-                                                                      beforesix = beforesix,
-                                                                      aftertwentytwo = aftertwentytwo,
-                                                                      isNotWorkday = isNotWorkday)
-        self.todayslength = len(self.sorted_elprices_today)
+        today = self._doCalculationPricesInclVat(nordpool_prices = nordpool_todays_prices,
+                                                 beforesix = beforesix,
+                                                 aftertwentytwo = aftertwentytwo,
+                                                 isNotWorkday = isNotWorkday)
 
         # Tomorrows prices if available
-        if len(nordpool_tomorrow_prices) > 0:
-            self.tomorrow_valid = True
-            isNotWorkday:bool = self._is_holiday(datetime.date.today() + datetime.timedelta(days = 1))
-            if (
-                datetime.datetime.today().weekday() == 4
-                or datetime.datetime.today().weekday() == 5
-            ):
-                isNotWorkday = True
-            beforesix += datetime.timedelta(days = 1)
-            aftertwentytwo += datetime.timedelta(days = 1)
-
-            self.sorted_elprices_tomorrow = self._doCalculationPricesInclVat(nordpool_prices = nordpool_tomorrow_prices,
-                                                                             beforesix = beforesix,
-                                                                             aftertwentytwo = aftertwentytwo,
-                                                                             isNotWorkday = isNotWorkday)
-        else:
-            self.tomorrow_valid = False
+        isNotWorkday:bool = self._is_holiday(datetime.date.today() + datetime.timedelta(days = 1))
+        if (
+            datetime.datetime.today().weekday() == 4
+            or datetime.datetime.today().weekday() == 5
+        ):
+            isNotWorkday = True
+        beforesix += datetime.timedelta(days = 1)
+        aftertwentytwo += datetime.timedelta(days = 1)
+
+        tomorrow = self._doCalculationPricesInclVat(nordpool_prices = nordpool_tomorrow_prices,
+                                                    beforesix = beforesix,
+                                                    aftertwentytwo = aftertwentytwo,
+                                                    isNotWorkday = isNotWorkday)
+
+        # Split longer slots when resolution changes so all slots have the same length
+        slot_lengths = today.slot_lengths() | tomorrow.slot_lengths()
+        if len(slot_lengths) > 1:
+            today = PriceSeries.from_price_hours(split_price_hours(price_hours = today.price_hours, resolution = min(slot_lengths)))
+            tomorrow = PriceSeries.from_price_hours(split_price_hours(price_hours = tomorrow.price_hours, resolution = min(slot_lengths)))
+
+        snap = PriceSnapshot(price_hours = today.price_hours + tomorrow.price_hours,
+                             todayslength = len(today),
+                             starts = today.starts + tomorrow.starts,
+                             ends = today.ends + tomorrow.ends,
+                             values = today.values + tomorrow.values)
+        if snap.fingerprint == self._snapshot.fingerprint:
+            return
+        for period in ('today', 'tomorrow', 'next_24h'):
+            self._get_price_statistics(snap, period = period)
+
+        # Replaces all published prices at once. Queries already running finish with the snapshot they read.
+        self._snapshot = snap
+        self._publish_prices(snap)
 
     def _doCalculationPricesInclVat(self,
                                     nordpool_prices,
                                     beforesix,
                                     aftertwentytwo,
-                                    isNotWorkday):
-        sorted_elprices:list = []
-        if type(self.daytax) == dict:
-            month_number = nordpool_prices[0]['start'].month
-            self.current_daytax = self.daytax[month_number]
-        else:
-            self.current_daytax = self.daytax
-        if type(self.nighttax) == dict:
-            month_number = nordpool_prices[0]['start'].month
-            self.current_nighttax = self.nighttax[month_number]
-        else:
-            self.current_nighttax = self.nighttax
-        
-        for item in nordpool_prices:
+                                    isNotWorkday) -> PriceSeries:
+        """ Adds taxes and subtracts support from start, end and kWh price records. Leaves raw prices unchanged. """
+
+        series = PriceSeries()
+        beforesix = beforesix.timestamp()
+        aftertwentytwo = aftertwentytwo.timestamp()
+
+        for start, end, price in nordpool_prices:
+            if not series.price_hours:
+                month_number = start.month
+                self.current_daytax = self.daytax[month_number] if type(self.daytax) == dict else self.daytax
+                self.current_nighttax = self.nighttax[month_number] if type(self.nighttax) == dict else self.nighttax
+
             calculated_support:float = 0.0 # Power support calculation
+            if price > self.power_support_above:
+                calculated_support = (price - self.power_support_above ) * self.support_amount
 
-            if float(item['value']) > self.power_support_above:
-                calculated_support = (float(item['value']) - self.power_support_above ) * self.support_amount
+            start_epoch = start.timestamp()
+            end_epoch = end.timestamp()
             if (
-                item['end'] <= beforesix
-                or item['start'] >= aftertwentytwo
+                end_epoch <= beforesix
+                or start_epoch >= aftertwentytwo
                 or isNotWorkday
             ):
-                item['value'] = round(float(item['value']) + self.current_nighttax + self.additional_tax - calculated_support, 3)
-                sorted_elprices.append(item['value'])
+                value = round(price + self.current_nighttax + self.additional_tax - calculated_support, 3)
             else:
-                item['value'] = round(float(item['value']) + self.current_daytax + self.additional_tax - calculated_support, 3)
-                sorted_elprices.append(item['value'])
+                value = round(price + self.current_daytax + self.additional_tax - calculated_support, 3)
 
-            price_item = PriceHour(
-                start=item['start'],
-                end=item['end'],
-                value=item['value']
-            )
-            self.elpricestoday.append(price_item)
-        sorted_elprices = sorted(sorted_elprices)
-        return sorted_elprices
+            series.append(price_hour = PriceHour(start = start, end = end, value = value),
+                          start = start_epoch,
+                          end = end_epoch)
+        return series
 
     def get_Continuous_Cheapest_Time(self,
                                      hoursTotal:float = 2,
@@ -308,87 +373,99 @@ class ElectricalPriceCalc(ad.ADBase):
         """ Returns starttime, estimated endtime, Final endtime and price for cheapest continuous hours,
             with different results depenting on time the call was made. """
 
-        indexesToFinish = math.ceil(hoursTotal / 24 * self.todayslength)
+        snap = self._snapshot
+        index_start = snap.slots.index_from(self._hour_now())
+        indexesToFinish = snap.slots.slot_count(hours = hoursTotal, index_start = index_start)
         if indexesToFinish == 0:
             indexesToFinish = 1
 
         finishAt = self.ADapi.datetime(aware=True).replace(hour = 0, minute = 0, second = 0, microsecond = 0) + datetime.timedelta(hours = finishByHour)
         if (
             self.ADapi.now_is_between('13:00:00', '23:59:59')
-            and len(self.elpricestoday) > self.todayslength
+            and len(snap.elpricestoday) > snap.todayslength
             or finishAt < self.ADapi.datetime(aware=True)
         ):
             finishAt += datetime.timedelta(days = 1)
 
         elif (
             self.ADapi.now_is_between('06:00:00', '15:00:00')
-            and len(self.elpricestoday) == self.todayslength
+            and len(snap.elpricestoday) == snap.todayslength
             and not calculateBeforeNextDayPrices
         ):
-            return None, None, self.sorted_elprices_today[indexesToFinish]
+            return None, None, snap.sorted_elprices_today[indexesToFinish]
 
         priceToComplete:float = 0.0
         avgPriceToComplete:float = 1000.0
 
-        checkTime = self.ADapi.datetime(aware=True).replace(minute = 0, second = 0, microsecond = 0)
-        start_times = [item.start for item in self.elpricestoday]
-        end_times = [item.end for item in self.elpricestoday]
-
-        index_start = bisect.bisect_left(start_times, checkTime)
-        index_end = bisect.bisect_right(end_times, finishAt)
+        index_end = snap.slots.index_ending_by(finishAt)
         startTime = None
         endTime = None
         start_at_index = index_start
+        window_highest = None
 
         if index_start < index_end - indexesToFinish:
-            index_end -= indexesToFinish
-            while index_start <= index_end:
-                for item in self.elpricestoday[index_start:index_start + indexesToFinish]:
-                    priceToComplete += item.value
-                if priceToComplete < avgPriceToComplete:
-                    avgPriceToComplete = priceToComplete
-                    startTime = self.elpricestoday[index_start].start
-                    endTime = self.elpricestoday[index_start+indexesToFinish-1].end
-                    start_at_index = index_start
-
-                priceToComplete = 0.0
-                index_start += 1
+            window = self._get_cheapest_windows(snap, index_start = index_start).lookup(duration = indexesToFinish,
+                                                                                       index_end = index_end)
+            if window is not None:
+                start_at_index, avgPriceToComplete, window_highest = window
+                startTime = snap.elpricestoday[start_at_index].start
+                endTime = snap.elpricestoday[start_at_index+indexesToFinish-1].end
         else:
-            if index_start + indexesToFinish > len(self.elpricestoday):
-                index_end = len(self.elpricestoday)
+            if index_start + indexesToFinish > len(snap.elpricestoday):
+                index_end = len(snap.elpricestoday)
             else:
                 index_end = index_end
-            for item in self.elpricestoday[index_start:index_end]:
+            for item in snap.elpricestoday[index_start:index_end]:
                 priceToComplete += item.value
-            startTime = self.elpricestoday[index_start].start
-            endTime = self.elpricestoday[index_end-1].end
+            startTime = snap.elpricestoday[index_start].start
+            endTime = snap.elpricestoday[index_end-1].end
             avgPriceToComplete = priceToComplete
         avgPriceToComplete = round(avgPriceToComplete/indexesToFinish, 3)
 
         # Get highest price:
         highest_price = avgPriceToComplete
-        for item in self.elpricestoday[start_at_index:start_at_index+indexesToFinish]:
-            if highest_price < item.value:
-                highest_price = item.value
+        if window_highest is not None:
+            if highest_price < window_highest:
+                highest_price = window_highest
+        else:
+            for item in snap.elpricestoday[start_at_index:start_at_index+indexesToFinish]:
+                if highest_price < item.value:
+                    highest_price = item.value
 
-        endTime = self._extend_Continuous_Cheapest_EndTime(endTime = endTime,
+        endTime = self._extend_Continuous_Cheapest_EndTime(snap,
+                                                           endTime = endTime,
                                                            price = highest_price,
                                                            stopAtPriceIncrease = stopAtPriceIncrease)
 
-        final_startTime = self._extend_Continuous_Cheapest_StartTime(startTime = startTime,
+        final_startTime = self._extend_Continuous_Cheapest_StartTime(snap,
+                                                               startTime = startTime,
                                                                price = highest_price,
                                                                startBeforePrice = startBeforePrice,
                                                                stopAtPriceIncrease = stopAtPriceIncrease)
-        timediff =  startTime - final_startTime
         return final_startTime, endTime, avgPriceToComplete
 
-    def _extend_Continuous_Cheapest_EndTime(self, endTime, price, stopAtPriceIncrease) -> datetime:
-        end_times = [item.end for item in self.elpricestoday]
-        index_start = bisect.bisect_left(end_times, endTime)
+    def _get_cheapest_windows(self, snap, index_start:int) -> CheapestWindowTable:
+        """ Returns table with cheapest windows from index_start for prices in snap. Rows are built on
+            first lookup. When the hour advances, the new table reuses window sums of the earlier one. """
+
+        cheapest_windows = snap.cheapest_windows
+        if cheapest_windows is None:
+            cheapest_windows = CheapestWindowTable(values = snap.slots.values, index_start = index_start)
+            snap.cheapest_windows = cheapest_windows
+        elif cheapest_windows.index_start != index_start:
+            cheapest_windows = cheapest_windows.from_start(index_start)
+            snap.cheapest_windows = cheapest_windows
+        return cheapest_windows
+
+    def _hour_now(self) -> datetime.datetime:
+        return self.ADapi.datetime(aware=True).replace(minute = 0, second = 0, microsecond = 0)
 
-        for i, current in enumerate(self.elpricestoday[index_start:]):
+    def _extend_Continuous_Cheapest_EndTime(self, snap, endTime, price, stopAtPriceIncrease) -> datetime:
+        index_start = snap.slots.index_ending_from(endTime)
+
+        for i, current in enumerate(snap.elpricestoday[index_start:]):
             original_index = index_start + i
-            next_item = self.elpricestoday[original_index + 1] if original_index < len(self.elpricestoday) - 1 else None
+            next_item = snap.elpricestoday[original_index + 1] if original_index < len(snap.elpricestoday) - 1 else None
 
             if next_item is None:
                 return current.end
@@ -396,26 +473,25 @@ class ElectricalPriceCalc(ad.ADBase):
                 return current.end
         return endTime
 
-    def _extend_Continuous_Cheapest_StartTime(self, startTime, price, startBeforePrice, stopAtPriceIncrease) -> datetime:
-        startHourPrice = self.electricity_price_now(startTime)
+    def _extend_Continuous_Cheapest_StartTime(self, snap, startTime, price, startBeforePrice, stopAtPriceIncrease) -> datetime:
+        startHourPrice = self._price_at(snap, time = startTime)
         checkTime = self.ADapi.datetime(aware=True).replace(minute = 0, second = 0, microsecond = 0)
-        start_times = [item.start for item in self.elpricestoday]
-        index_now = bisect.bisect_left(start_times, checkTime)
-        stop_index = bisect.bisect_left(start_times, startTime)
+        index_now = snap.slots.index_from(checkTime)
+        stop_index = snap.slots.index_from(startTime)
 
-        for i, current in enumerate(self.elpricestoday[stop_index: stop_index + 4]):
+        for i, current in enumerate(snap.elpricestoday[stop_index: stop_index + 4]):
             original_index = stop_index + i
-            next_item = self.elpricestoday[original_index + 1] if original_index < len(self.elpricestoday) - 1 else None
-            if current.start - startTime <= datetime.timedelta(hours = 1):
+            next_item = snap.elpricestoday[original_index + 1] if original_index < len(snap.elpricestoday) - 1 else None
+            if duration_between(startTime, current.start) <= datetime.timedelta(hours = 1):
                 if (
                     price < startHourPrice - (stopAtPriceIncrease * 1.5)
                     and startHourPrice < next_item.value - (stopAtPriceIncrease * 1.3)
                 ):
                     return next_item.start
 
-        for i, current in enumerate(reversed(self.elpricestoday[index_now:stop_index + 1])):
+        for i, current in enumerate(reversed(snap.elpricestoday[index_now:stop_index + 1])):
             original_index = stop_index - i
-            prev_item = self.elpricestoday[original_index - 1] if original_index > 0 else None
+            prev_item = snap.elpricestoday[original_index - 1] if original_index > 0 else None
             if prev_item is None:
                 return current.start
 
@@ -434,18 +510,41 @@ class ElectricalPriceCalc(ad.ADBase):
                           ) -> float:
         """ Compares the X hour lowest price to a minimum change and retuns the highest price of those two. """
 
-        hours = int(hours / 24 * self.todayslength)
-        if checkitem <= self.todayslength - (2 / 24 * self.todayslength):
+        return self._get_lowest_prices(self._snapshot, checkitem = checkitem, hours = hours, min_change = min_change)
+
+    def _get_lowest_prices(self, snap, checkitem, hours, min_change) -> float:
+        hours = snap.slots.slot_count(hours = hours, round_up = False)
+        if checkitem <= self._last_index_to_use_todays_prices(snap):
+            hours = min(hours, len(snap.sorted_elprices_today) - 1)
             if min_change is not None:
-                if self.sorted_elprices_today[hours] < self.sorted_elprices_today[0] + min_change:
-                    return self.sorted_elprices_today[0] + min_change
-        elif self.tomorrow_valid:
+                if snap.sorted_elprices_today[hours] < snap.sorted_elprices_today[0] + min_change:
+                    return snap.sorted_elprices_today[0] + min_change
+        elif snap.tomorrow_valid:
+            hours = min(hours, len(snap.sorted_elprices_tomorrow) - 1)
             if min_change is not None:
-                if self.sorted_elprices_tomorrow[hours] < self.sorted_elprices_tomorrow[0] + min_change:
-                    return self.sorted_elprices_tomorrow[0] + min_change
-            return self.sorted_elprices_tomorrow[hours]
+                if snap.sorted_elprices_tomorrow[hours] < snap.sorted_elprices_tomorrow[0] + min_change:
+                    return snap.sorted_elprices_tomorrow[0] + min_change
+            return snap.sorted_elprices_tomorrow[hours]
         
-        return self.sorted_elprices_today[hours]
+        return snap.sorted_elprices_today[min(hours, len(snap.sorted_elprices_today) - 1)]
+
+    def _last_index_to_use_todays_prices(self, snap) -> int:
+        """ Returns index of last slot starting 2 hours or more before end of today. """
+
+        return snap.slots.index_after(snap.slots.today_end - 2 * 3600) - 1
+
+    def _lowest_prices_per_slot(self, snap, hours, min_change) -> List[float]:
+        """ Returns get_lowest_prices for every slot in elpricestoday. """
+
+        if not snap.elpricestoday:
+            return []
+        last_today_index = self._last_index_to_use_todays_prices(snap)
+        lowest_today = self._get_lowest_prices(snap, checkitem = 0, hours = hours, min_change = min_change)
+        items_after_today = len(snap.elpricestoday) - last_today_index - 1
+        if items_after_today <= 0:
+            return [lowest_today] * len(snap.elpricestoday)
+        lowest_later = self._get_lowest_prices(snap, checkitem = last_today_index + 1, hours = hours, min_change = min_change)
+        return [lowest_today] * (last_today_index + 1) + [lowest_later] * items_after_today
 
     def find_times_to_save(self,
                            pricedrop: float,
@@ -453,27 +552,75 @@ class ElectricalPriceCalc(ad.ADBase):
                            on_for_minimum: int,
                            pricedifference_increase: float,
                            reset_continuous_hours: bool,
-                           previous_save_hours: list
+                           previous_save_hours: list,
+                           planner: str = 'heuristic'
                            ) -> list:
         """Finds peak variations in electricity price for saving purposes and returns list with datetime objects;
-           'start', 'end' and 'duration' as a timedelta object for how long the electricity has been off. """
+           'start', 'end' and 'duration' as a timedelta object for how long the electricity has been off.
+           Use planner 'optimal' to find save hours with the highest avoided cost instead of by price peaks.
+           Raises ValueError for other planners. """
 
+        snap = self._snapshot
         checkTime = self.ADapi.datetime(aware=True).replace(minute=0, second=0, microsecond=0)
-        start_times = [item.start for item in self.elpricestoday]
-        index_now = bisect.bisect_left(start_times, checkTime)
+        index_now = snap.slots.index_from(checkTime)
 
         saving_hours_list:list = []
         continuous_hours_from_old_calc = 0
-        on_for_minimum = ((on_for_minimum)/ self.todayslength) * 24
 
         if previous_save_hours:
             saving_hours_list, continuous_hours_from_old_calc = self._keep_already_calculated_save_hours(
+                snap,
                 previous_save_hours = previous_save_hours,
                 reset_continuous_hours = reset_continuous_hours,
                 max_continuous_hours = max_continuous_hours,
-                on_for_minimum = on_for_minimum
+                on_for_minimum = on_for_minimum * snap.slots.hours_per_slot(index_now)
             )
+        return self._find_times_to_save(
+            snap,
+            index_now = index_now,
+            saving_hours_list = saving_hours_list,
+            continuous_hours_from_old_calc = continuous_hours_from_old_calc,
+            pricedrop = pricedrop,
+            max_continuous_hours = max_continuous_hours,
+            on_for_minimum = on_for_minimum,
+            pricedifference_increase = pricedifference_increase,
+            reset_continuous_hours = reset_continuous_hours,
+            planner = planner
+        )
+
+    def _find_times_to_save(self,
+                            snap,
+                            index_now,
+                            saving_hours_list,
+                            continuous_hours_from_old_calc,
+                            pricedrop,
+                            max_continuous_hours,
+                            on_for_minimum,
+                            pricedifference_increase,
+                            reset_continuous_hours,
+                            planner
+                            ) -> list:
+        """ Finds save hours from index_now with elapsed save hours and continuous hours already used. """
+
+        if planner not in ('heuristic', 'optimal'):
+            raise ValueError(f"Unknown planner {planner}. Use heuristic or optimal")
+        on_for_minimum_hours = on_for_minimum
+        on_for_minimum = on_for_minimum * snap.slots.hours_per_slot(index_now)
+
+        if planner == 'optimal':
+            return self._plan_save_hours(
+                snap,
+                index_now = index_now,
+                pricedrop = pricedrop,
+                max_continuous_hours = max_continuous_hours,
+                on_for_minimum = on_for_minimum_hours,
+                pricedifference_increase = pricedifference_increase,
+                continuous_hours_from_old_calc = 0 if reset_continuous_hours else continuous_hours_from_old_calc,
+                saving_hours_list = saving_hours_list
+            )
+
         saving_hours_list = self._find_peak_hours(
+            snap,
             index_now = index_now,
             pricedrop = pricedrop,
             saving_hours_list = saving_hours_list
@@ -481,6 +628,7 @@ class ElectricalPriceCalc(ad.ADBase):
 
         if saving_hours_list:
             saving_hours_list = self._remove_save_hours_too_low(
+                snap,
                 index_now = index_now,
                 saving_hours_list = saving_hours_list,
                 on_for_minimum = on_for_minimum,
@@ -488,6 +636,7 @@ class ElectricalPriceCalc(ad.ADBase):
             )
 
             saving_hours_list = self._calculate_save_hours(
+                snap,
                 index_now = index_now,
                 pricedrop = pricedrop,
                 max_continuous_hours = max_continuous_hours,
@@ -497,60 +646,395 @@ class ElectricalPriceCalc(ad.ADBase):
                 saving_hours_list = saving_hours_list,
                 reset_continuous_hours = reset_continuous_hours
             )
-            peak_list = self._putPeaksInOrder(saving_hours_list)
+            peak_list = self._putPeaksInOrder(snap, saving_hours_list)
             return peak_list
         else:
             return []
 
+    def _plan_save_hours(self,
+                         snap,
+                         index_now,
+                         pricedrop,
+                         max_continuous_hours,
+                         on_for_minimum,
+                         pricedifference_increase,
+                         continuous_hours_from_old_calc,
+                         saving_hours_list
+                         ) -> list:
+        """ Plans save hours with dynamic programming. Turning off a slot avoids its price minus the price
+            where consumption resumes and the required price drop, increasing per slot like the heuristic.
+            Off periods are limited by max_continuous_hours and must be followed by on_for_minimum hours on,
+            proportional to the length of the period. """
+
+        # Last elapsed off period. Hours used from continuous_hours_from_old_calc only continue
+        # when it reaches index_now, else recovery is counted from where it ended.
+        saved = set(saving_hours_list)
+        index_end = index_now
+        while index_end > 0 and snap.elpricestoday[index_end - 1].start not in saved:
+            index_end -= 1
+        index_first = index_end
+        while index_first > 0 and snap.elpricestoday[index_first - 1].start in saved:
+            index_first -= 1
+
+        used_slots = 0
+        on_slots = index_now - index_end
+        if (
+            continuous_hours_from_old_calc > 0
+            and index_end > index_first
+        ):
+            if on_slots == 0:
+                used_slots = snap.slots.slot_count(hours = continuous_hours_from_old_calc, index_start = index_now, round_up = False)
+            else:
+                used_slots = index_end - index_first
+
+        off_slots = plan_save_slots(
+            values = snap.slots.values,
+            index_start = index_now,
+            pricedrop = pricedrop,
+            increase_per_slot = (pricedifference_increase - 1) * snap.slots.hours_per_slot(index_now) + 1,
+            max_slots = snap.slots.slot_count(hours = max_continuous_hours, index_start = index_now, round_up = False),
+            recovery_slots = snap.slots.slot_count(hours = on_for_minimum, index_start = index_now),
+            used_slots = used_slots,
+            on_slots = on_slots
+        )
+        saving_hours_list.extend(snap.elpricestoday[index].start for index in off_slots)
+        return self._putPeaksInOrder(snap, saving_hours_list)
+
+    def get_save_session(self,
+                         name:str,
+                         pricedrop:float,
+                         max_continuous_hours:int,
+                         on_for_minimum:int,
+                         pricedifference_increase:float,
+                         reset_continuous_hours:bool = False,
+                         planner:str = 'heuristic'
+                         ) -> SaveHoursSession:
+        """ Returns save hours session for consumer name, created on first call and with settings updated on later calls.
+            Call find_times_to_save() on the session instead of passing previous save hours. """
+
+        if planner not in ('heuristic', 'optimal'):
+            raise ValueError(f"Unknown planner {planner}. Use heuristic or optimal")
+        settings = {
+            'pricedrop': pricedrop,
+            'max_continuous_hours': max_continuous_hours,
+            'on_for_minimum': on_for_minimum,
+            'pricedifference_increase': pricedifference_increase,
+            'reset_continuous_hours': reset_continuous_hours,
+            'planner': planner,
+        }
+        with self._save_sessions_lock:
+            session = self._save_sessions.get(name)
+            if session is None:
+                session = SaveHoursSession(app = self, **settings)
+                self._save_sessions[name] = session
+                return session
+        session.update(**settings)
+        return session
+
+    def remove_save_session(self, name:str) -> None:
+        """ Removes save hours session for consumer name. """
+
+        with self._save_sessions_lock:
+            self._save_sessions.pop(name, None)
+
     def find_times_to_spend(self,
                             priceincrease:float
                             ) -> list:
         """ Finds low price variations in electricity price for spending purposes.
             Returns list with datetime objects. """
 
+        snap = self._snapshot
         checkTime = self.ADapi.datetime(aware=True).replace(minute=0, second=0, microsecond=0)
-        start_times = [item.start for item in self.elpricestoday]
-
-        index_now = bisect.bisect_left(start_times, checkTime)
-        low_priced_items = []
+        index_now = snap.slots.index_from(checkTime)
 
-        for i, current in enumerate(self.elpricestoday[index_now:-2]):
-            original_index = index_now + i
-            prev_item = self.elpricestoday[original_index - 1] if original_index > 0 else None
-            next_item = self.elpricestoday[original_index + 1] if original_index < len(self.elpricestoday) - 1 else None
-                # Checks if price increases more than wanted peak difference
-            if (
-                next_item.value - current.value >= priceincrease
-                and current.value <= self.get_lowest_prices(checkitem = original_index, hours = 3, min_change = None)
-            ):
-                if not current.start in low_priced_items:
-                    low_priced_items.append(current.start)
-                if (
-                    prev_item.value < current.value
-                    and not prev_item.start in low_priced_items
-                ):
-                    low_priced_items.append(prev_item.start)
-                # Checks if price increases x1,4 peak difference during two hours
-            elif (
-                next_item.value - current.value >= (priceincrease * 0.6)
-                and next_item.value - prev_item.value >= (priceincrease * 1.4)
-                and prev_item.value <= self.get_lowest_prices(checkitem = original_index, hours = 3, min_change = None)
-                and not prev_item.start in low_priced_items
-            ):
-                low_priced_items.append(prev_item.start)
+        low_price_mask = spend_mask(
+            values = [item.value for item in snap.elpricestoday],
+            index_now = index_now,
+            priceincrease = priceincrease,
+            lowest_prices = self._lowest_prices_per_slot(snap, hours = 3, min_change = None)
+        )
+        low_priced_items = [item.start for item, is_low in zip(snap.elpricestoday, low_price_mask) if is_low]
 
-        low_priced_list = self._putPeaksInOrder(low_priced_items)
+        low_priced_list = self._putPeaksInOrder(snap, low_priced_items)
         return low_priced_list
 
     def electricity_price_now(self, time = None) -> float:
         """ Return current complete electricity price based on now or time given. """
 
+        return self._price_at(self._snapshot, time = time)
+
+    def _price_at(self, snap, time) -> float:
         if time is None:
             time = self.ADapi.datetime(aware=True)
-        for range_item in self.elpricestoday:
-            if (start := range_item.start) <= time < (end := range_item.end):
-                return range_item.value
-        return None
+        index = snap.slots.index_at(time)
+        if index is None:
+            return None
+        return snap.elpricestoday[index].value
+
+    def get_price_statistics(self, period:str = 'today') -> PriceStatistics:
+        """ Returns min, max, mean, median, spread, volatility and percentiles of prices 'today', 'tomorrow'
+            or the 'next_24h' from the current slot. Returns None without prices for period.
+            Statistics are calculated once for each period and price slot. """
+
+        return self._get_price_statistics(self._snapshot, period = period)
+
+    def _get_price_statistics(self, snap, period) -> PriceStatistics:
+        slots = snap.slots
+        if period == 'today':
+            key = period
+            index_start, index_end = 0, slots.todayslength
+        elif period == 'tomorrow':
+            key = period
+            index_start, index_end = slots.todayslength, len(slots)
+        elif period == 'next_24h':
+            index_start = self._index_from_time(snap, None)
+            index_end = min(index_start + slots.slot_count(hours = 24, index_start = index_start), len(slots))
+            key = (period, index_start)
+        else:
+            raise ValueError(f"Unknown period {period}. Use today, tomorrow or next_24h")
+
+        if key not in snap.statistics:
+            values = slots.values[index_start:index_end]
+            snap.statistics[key] = PriceStatistics(
+                values = values,
+                start = snap.elpricestoday[index_start].start,
+                end = snap.elpricestoday[index_end - 1].end
+            ) if values else None
+        return snap.statistics[key]
+
+    def get_cost_of_load_profiles(self,
+                                  load_profiles:list,
+                                  startTime:datetime.datetime = None
+                                  ) -> List[LoadProfileCost]:
+        """ Calculates cost including support and taxes for load profiles given as kW per price slot,
+            starting with the slot at startTime or now. Takes one profile or many profiles as any iterable
+            of numbers, like lists, arrays or ranges, and returns list with total and cost per slot for each profile.
+            An empty profile costs 0.0 and ends at its start. """
+
+        snap = self._snapshot
+        if startTime is None:
+            startTime = self.ADapi.datetime(aware=True)
+        load_profiles = list(load_profiles)
+        if (
+            not load_profiles
+            or not snap.elpricestoday
+            or startTime >= snap.elpricestoday[-1].end
+        ):
+            return []
+        if isinstance(load_profiles[0], numbers.Real):
+            load_profiles = [load_profiles]
+
+        index_start = max(snap.slots.index_after(startTime) - 1, 0)
+        energy_prices = slot_energy_prices(snap.elpricestoday[index_start:])
+
+        profile_costs:list = []
+        start = snap.elpricestoday[index_start].start
+        for total, slot_costs in cost_of_load_profiles(energy_prices = energy_prices, load_profiles = load_profiles):
+            profile_costs.append(LoadProfileCost(
+                start = start,
+                end = snap.elpricestoday[index_start + len(slot_costs) - 1].end if slot_costs else start,
+                total = total,
+                slot_costs = slot_costs
+            ))
+        return profile_costs
+
+    def find_next_time_price_below(self,
+                                   price:float,
+                                   time:datetime.datetime = None
+                                   ) -> PriceHour:
+        """ Returns first price slot from the slot at time or now with price at or below price, or None. """
+
+        snap = self._snapshot
+        index = snap.price_index.next_at_most(price = price, index_start = self._index_from_time(snap, time))
+        return snap.elpricestoday[index] if index is not None else None
+
+    def find_next_time_price_above(self,
+                                   price:float,
+                                   time:datetime.datetime = None
+                                   ) -> PriceHour:
+        """ Returns first price slot from the slot at time or now with price at or above price, or None. """
+
+        snap = self._snapshot
+        index = snap.price_index.next_at_least(price = price, index_start = self._index_from_time(snap, time))
+        return snap.elpricestoday[index] if index is not None else None
+
+    def find_longest_time_below(self,
+                                price:float,
+                                deadline:datetime.datetime,
+                                time:datetime.datetime = None
+                                ) -> PeakHour:
+        """ Returns longest continuous time with price at or below price from the slot at time or now,
+            ending no later than deadline. Returns None if price is above in all slots. """
+
+        snap = self._snapshot
+        run = snap.price_index.longest_run_at_most(price = price,
+                                                   index_start = self._index_from_time(snap, time),
+                                                   index_stop = snap.slots.index_ending_by(deadline))
+        if run is None:
+            return None
+        start = snap.elpricestoday[run[0]].start
+        end = snap.elpricestoday[run[1] - 1].end
+        return PeakHour(
+            start = start,
+            end = end,
+            duration = duration_between(start, end)
+        )
+
+    def _index_from_time(self, snap, time) -> int:
+        """ Returns index of slot at time or now, or of first slot starting after time. """
+
+        if time is None:
+            time = self.ADapi.datetime(aware=True)
+        index = snap.slots.index_at(time)
+        return index if index is not None else snap.slots.index_from(time)
+
+    # Notifications. Callbacks run on the thread that publishes prices or starts the slot, not on the thread
+    # of the app that registered them. Apps should call cancel_price_listener in terminate().
+    def listen_prices(self, callback, **kwargs) -> str:
+        """ Calls callback(event, data, kwargs) once each time new prices are published.
+            Returns handle to use with cancel_price_listener. """
+
+        return self._add_price_listener(event = 'prices', callback = callback, threshold = None, kwargs = kwargs)
+
+    def listen_slot_change(self, callback, **kwargs) -> str:
+        """ Calls callback(event, data, kwargs) at start of every price slot.
+            Returns handle to use with cancel_price_listener. """
+
+        return self._add_price_listener(event = 'slot', callback = callback, threshold = None, kwargs = kwargs)
+
+    def listen_price_threshold(self, callback, threshold:float, **kwargs) -> str:
+        """ Calls callback(event, data, kwargs) when price now goes above or falls to or below threshold.
+            Data has 'above' set to True if price is above threshold. Returns handle to use with cancel_price_listener. """
+
+        return self._add_price_listener(event = 'threshold', callback = callback, threshold = threshold, kwargs = kwargs)
+
+    def cancel_price_listener(self, handle:str) -> None:
+        """ Cancels callback registered with listen_prices, listen_slot_change or listen_price_threshold.
+            Call it in terminate() of the app that registered the callback. """
+
+        self._price_listeners.pop(handle, None)
+
+    def _add_price_listener(self, event, callback, threshold, kwargs) -> str:
+        handle = uuid.uuid4().hex
+        price = self.electricity_price_now()
+        # App with callback as method. Its listeners are dropped when the app is terminated or reloaded.
+        owner = getattr(callback, '__self__', None)
+        self._price_listeners[handle] = {
+            'event': event,
+            'callback': callback,
+            'app': owner.name if owner is not self and isinstance(getattr(owner, 'name', None), str) else None,
+            'threshold': threshold,
+            'above': price > threshold if threshold is not None and price is not None else None,
+            'kwargs': kwargs,
+        }
+        return handle
+
+    def _publish_prices(self, snap) -> None:
+        self._schedule_slot_change(snap)
+        data = self._price_data(snap)
+        self._notify_price_listeners(event = 'prices', data = data)
+        if self.price_events:
+            self._fire_price_event(snap, event = 'prices', data = data)
+        self._check_price_thresholds(snap, data = data)
+
+    def _schedule_slot_change(self, snap) -> None:
+        if (
+            self._slot_timer is not None
+            and self.ADapi.timer_running(self._slot_timer)
+        ):
+            self.ADapi.cancel_timer(self._slot_timer)
+        self._slot_timer = None
+
+        index_next = snap.slots.index_after(self.ADapi.datetime(aware=True))
+        if index_next < len(snap.elpricestoday):
+            self._slot_timer = self.ADapi.run_at(self._slot_changed, snap.elpricestoday[index_next].start)
+
+    def _slot_changed(self, kwargs) -> None:
+        self._slot_timer = None
+        snap = self._snapshot
+        self._get_price_statistics(snap, period = 'next_24h')
+        data = self._price_data(snap)
+        self._notify_price_listeners(event = 'slot', data = data)
+        if self.price_events:
+            self._fire_price_event(snap, event = 'slot', data = data)
+        self._check_price_thresholds(snap, data = data)
+        self._schedule_slot_change(snap)
+
+    def _check_price_thresholds(self, snap, data) -> None:
+        price = data['price']
+        if price is None:
+            return
+
+        for handle, listener in list(self._price_listeners.items()):
+            if listener['event'] != 'threshold':
+                continue
+            above = price > listener['threshold']
+            if above != listener['above']:
+                was_checked = listener['above'] is not None
+                listener['above'] = above
+                if was_checked:
+                    self._call_price_listener(handle = handle,
+                                              listener = listener,
+                                              data = dict(data, threshold = listener['threshold'], above = above))
+
+        if self.price_events:
+            for threshold in self.price_event_thresholds:
+                above = price > threshold
+                if above != self._event_threshold_above.get(threshold):
+                    was_checked = threshold in self._event_threshold_above
+                    self._event_threshold_above[threshold] = above
+                    if was_checked:
+                        self._fire_price_event(snap, event = 'threshold',
+                                               data = dict(data, threshold = threshold, above = above))
+
+    def _notify_price_listeners(self, event, data) -> None:
+        for handle, listener in list(self._price_listeners.items()):
+            if listener['event'] == event:
+                self._call_price_listener(handle = handle, listener = listener, data = data)
+
+    def _call_price_listener(self, handle, listener, data) -> None:
+        if (
+            listener['app'] is not None
+            and self.ADapi.get_app(listener['app']) is not listener['callback'].__self__
+        ):
+            self._price_listeners.pop(handle, None)
+            self.ADapi.log(f"Removed {listener['event']} listener of {listener['app']} that is no longer running. "
+                           "Call cancel_price_listener in terminate().", level = 'WARNING')
+            return
+        try:
+            listener['callback'](listener['event'], data, listener['kwargs'])
+        except Exception as e:
+            self.ADapi.log(f"Price listener {listener['callback']} failed on {listener['event']}. Exception: {e}", level = 'WARNING')
+
+    def _price_data(self, snap) -> dict:
+        """ Returns prices published and price slot now. """
+
+        index_now = snap.slots.index_at(self.ADapi.datetime(aware=True))
+        slot = snap.elpricestoday[index_now] if index_now is not None else None
+        return {
+            'elpricestoday': snap.elpricestoday,
+            'todayslength': snap.todayslength,
+            'tomorrow_valid': snap.tomorrow_valid,
+            'slot': slot,
+            'price': slot.value if slot is not None else None,
+        }
+
+    def _fire_price_event(self, snap, event, data) -> None:
+        slot = data['slot']
+        event_data = {
+            'app': self.name,
+            'price': data['price'],
+            'start': slot.start.isoformat() if slot is not None else None,
+            'end': slot.end.isoformat() if slot is not None else None,
+            'tomorrow_valid': data['tomorrow_valid'],
+        }
+        if event == 'prices':
+            event_data['today'] = snap.slots.values[:snap.todayslength]
+            event_data['tomorrow'] = snap.slots.values[snap.todayslength:]
+        elif event == 'threshold':
+            event_data['threshold'] = data['threshold']
+            event_data['above'] = data['above']
+        self.ADapi.fire_event(f"ELECTRICALPRICECALC_{event.upper()}", **event_data)
 
     def print_peaks(self,
                     saving_hours_list:list = []
@@ -573,12 +1057,13 @@ class ElectricalPriceCalc(ad.ADBase):
                             )
         return print_saving_hours_list
 
-    def _putPeaksInOrder(self, saving_hours_list):
+    def _putPeaksInOrder(self, snap, saving_hours_list):
         peak_list:list = []
         continue_from_peak = False
 
-        for current in self.elpricestoday:
-            if current.start in [item for item in saving_hours_list]:
+        saving_hours = set(saving_hours_list)
+        for current in snap.elpricestoday:
+            if current.start in saving_hours:
                 if not continue_from_peak:
                     start_of_peak = current.start
                 continue_from_peak = True
@@ -588,13 +1073,14 @@ class ElectricalPriceCalc(ad.ADBase):
                 peak = PeakHour(
                     start=start_of_peak,
                     end=current.start,
-                    duration=current.start - start_of_peak
+                    duration=duration_between(start_of_peak, current.start)
                 )
                 peak_list.append(peak)
         
         return peak_list
 
     def _keep_already_calculated_save_hours(self,
+                                            snap,
                                             previous_save_hours,
                                             reset_continuous_hours,
                                             max_continuous_hours,
@@ -603,8 +1089,6 @@ class ElectricalPriceCalc(ad.ADBase):
         saving_hours_list = []
         continuous_hours_from_old_calc = 0
         continuous_hours_int = 0
-        start_times = [item.start for item in self.elpricestoday]
-        end_times = [item.end for item in self.elpricestoday]
         checkTime = self.ADapi.datetime(aware=True).replace(minute=0, second=0, microsecond=0)
 
         for item in previous_save_hours:
@@ -624,7 +1108,7 @@ class ElectricalPriceCalc(ad.ADBase):
                         continuous_hours_from_old_calc = 0
                 return saving_hours_list, math.ceil(continuous_hours_from_old_calc)
             else:
-                index_now = bisect.bisect_left(start_times, item.start)
+                index_now = snap.slots.index_from(item.start)
 
                 # Find previous continuous time and remove.
                 if (
@@ -646,26 +1130,24 @@ class ElectricalPriceCalc(ad.ADBase):
                 end_of_last_peak = item.end
                 if item.end > checkTime:
                     end_of_peak = checkTime
-                    index_end = bisect.bisect_right(end_times, checkTime)
+                    index_end = snap.slots.index_ending_by(checkTime)
 
-                    for current in self.elpricestoday[index_now:index_end]:
+                    for current in snap.elpricestoday[index_now:index_end]:
                         saving_hours_list.append(current.start)
                     if not reset_continuous_hours:
-                        continuous_hours = end_of_peak - start_of_peak
-                        continuous_hours_int = (continuous_hours.days * 24 * 60 + continuous_hours.seconds // 60) / 60
+                        continuous_hours_int = hours_between(start_of_peak, end_of_peak)
                         continuous_hours_from_old_calc += continuous_hours_int
                     return saving_hours_list, math.ceil(continuous_hours_from_old_calc)
 
                 else:
-                    index_end = bisect.bisect_right(end_times, item.end)
+                    index_end = snap.slots.index_ending_by(item.end)
                     end_of_peak = item.end
 
-                    for current in self.elpricestoday[index_now:index_end]:
+                    for current in snap.elpricestoday[index_now:index_end]:
                         saving_hours_list.append(current.start)
 
                     if not reset_continuous_hours:
-                        continuous_hours = end_of_peak - start_of_peak
-                        continuous_hours_int = (continuous_hours.days * 24 * 60 + continuous_hours.seconds // 60) / 60
+                        continuous_hours_int = hours_between(start_of_peak, end_of_peak)
                         continuous_hours_from_old_calc += continuous_hours_int
                     else:
                         continuous_hours_from_old_calc = 0
@@ -693,65 +1175,65 @@ class ElectricalPriceCalc(ad.ADBase):
                                            continuous_hours_int,
                                            max_continuous_hours,
                                            on_for_minimum):
-        time_since_last_peak = current_time - last_end_of_peak
-        time_since_last_peak_int = (time_since_last_peak.days * 24 * 60 + time_since_last_peak.seconds // 60) / 60
+        time_since_last_peak_int = hours_between(last_end_of_peak, current_time)
         difference = max_continuous_hours - continuous_hours_int
         return (difference / on_for_minimum) * time_since_last_peak_int
 
 
     def _find_peak_hours(self,
+                         snap,
                          index_now,
                          pricedrop,
                          saving_hours_list
                          ):
-        for i, current in enumerate(self.elpricestoday[index_now:-1]):
-            original_index = index_now + i
-            prev_item = self.elpricestoday[original_index - 1] if original_index > 0 else None
-            next_item = self.elpricestoday[original_index + 1] if original_index < len(self.elpricestoday) - 1 else None
-
-            # If price drops more than wanted peak difference
-            if current.value - next_item.value >= pricedrop and current.start not in saving_hours_list:
-                saving_hours_list.append(current.start)
-            # If price drops during 2 hours
-            elif prev_item is not None:
-                if prev_item.value - next_item.value >= pricedrop * 1.3 and prev_item.start not in saving_hours_list:
-                    saving_hours_list.append(prev_item.start)
+        already_saving = set(saving_hours_list)
+        save_mask = peak_mask(
+            values = [item.value for item in snap.elpricestoday],
+            index_now = index_now,
+            pricedrop = pricedrop,
+            marked = [item.start in already_saving for item in snap.elpricestoday] if already_saving else [False] * len(snap.elpricestoday)
+        )
+        saving_hours_list.extend(
+            item.start for item, is_peak in zip(snap.elpricestoday, save_mask)
+            if is_peak and item.start not in already_saving
+        )
 
         return saving_hours_list
 
-    def _determine_stop_calculating_at(self, saving_hours_list):
-        stop_calculating_at = int(40 / 24 * self.todayslength)
+    def _determine_stop_calculating_at(self, snap, saving_hours_list):
+        stop_calculating_at = snap.slots.index_from(snap.slots.first_start + 40 * 3600)
         after_peak_price = 100
-        last_peak_end_time = self.elpricestoday[0].start
-        calculate_from = len(self.elpricestoday)
-        for i, current in enumerate(reversed(self.elpricestoday)):
-            if i < len(self.elpricestoday):
+        last_peak_end_time = snap.elpricestoday[0].start
+        calculate_from = len(snap.elpricestoday)
+        for i, current in enumerate(reversed(snap.elpricestoday)):
+            if i < len(snap.elpricestoday):
                 if current.start in saving_hours_list:
                     last_peak_end_time = current.end
-                    original_index = len(self.elpricestoday) - i -1
-                    after_peak_price = float(self.elpricestoday[original_index +1].value)
+                    original_index = len(snap.elpricestoday) - i -1
+                    after_peak_price = float(snap.elpricestoday[original_index +1].value)
                     calculate_from -= i
                     break
 
         stop_calculating_at = (
-            self.todayslength if len(self.elpricestoday) == self.todayslength else
+            snap.todayslength if len(snap.elpricestoday) == snap.todayslength else
             min(stop_calculating_at, calculate_from)
         )
         return stop_calculating_at, after_peak_price, last_peak_end_time
 
     def _remove_save_hours_too_low(self,
+                                   snap,
                                    index_now,
                                    saving_hours_list,
                                    on_for_minimum,
                                    pricedrop
                                    ):
-        for i, current in enumerate(self.elpricestoday[index_now:-2]):
+        for i, current in enumerate(snap.elpricestoday[index_now:-2]):
             if current.start in saving_hours_list:
                 original_index = index_now + i
-                prev_item = self.elpricestoday[original_index-1]
-                next_item = self.elpricestoday[original_index+1]
+                prev_item = snap.elpricestoday[original_index-1]
+                next_item = snap.elpricestoday[original_index+1]
                 if (
-                    current.value < self.get_lowest_prices(checkitem = original_index, hours = on_for_minimum, min_change = pricedrop)
+                    current.value < self._get_lowest_prices(snap, checkitem = original_index, hours = on_for_minimum, min_change = pricedrop)
                     or prev_item.value < next_item.value
                 ):
                     saving_hours_list.remove(current.start)
@@ -759,6 +1241,7 @@ class ElectricalPriceCalc(ad.ADBase):
         return saving_hours_list
 
     def _calculate_save_hours(self,
+                              snap,
                               index_now,
                               pricedrop,
                               max_continuous_hours,
@@ -772,31 +1255,33 @@ class ElectricalPriceCalc(ad.ADBase):
         peakdiff = pricedrop
         current_max_continuous_hours = max_continuous_hours
 
-        stop_calculating_at, after_peak_price, last_peak_end_time = self._determine_stop_calculating_at(saving_hours_list = saving_hours_list)
+        stop_calculating_at, after_peak_price, last_peak_end_time = self._determine_stop_calculating_at(snap, saving_hours_list = saving_hours_list)
         continue_from_peak = False
         continuous_hours_int:float = 0
-        pricedifference_increase = ((pricedifference_increase-1)/ self.todayslength) * 24 + 1
+        hours_per_slot = snap.slots.hours_per_slot(index_now)
+        pricedifference_increase = (pricedifference_increase-1) * hours_per_slot + 1
 
         check_index_now = stop_calculating_at - index_now -1
 
-        for i, current in enumerate(reversed(self.elpricestoday[index_now:stop_calculating_at])):
+        for i, current in enumerate(reversed(snap.elpricestoday[index_now:stop_calculating_at])):
             if current.start in saving_hours_list:
                 if not continue_from_peak:
                     last_peak_end_time = current.end
                     original_index = stop_calculating_at - i -1
-                    after_peak_price = float(self.elpricestoday[original_index +1].value)
-                continuous_hours = last_peak_end_time - current.start
+                    after_peak_price = float(snap.elpricestoday[original_index +1].value)
+                continuous_hours = duration_between(current.start, last_peak_end_time)
                 continue_from_peak = True
             elif current.value > after_peak_price + peakdiff and continue_from_peak:
                 # Price is higher than peakdiff. Add to save
                 peakdiff *= pricedifference_increase  # Adds a x% increase in price difference per hour saving.
-                continuous_hours = last_peak_end_time - current.start
+                continuous_hours = duration_between(current.start, last_peak_end_time)
                 if current.start not in saving_hours_list:
                     saving_hours_list.append(current.start)
             elif continuous_hours > datetime.timedelta(0) or continue_from_peak:
                 # If no peak/save found; reset
                 continue_from_peak = False
                 saving_hours_list, last_peak_end_time, continuous_hours_int = self._calculate_continuous_hours(
+                    snap,
                     saving_hours_list = saving_hours_list,
                     max_continuous_hours = current_max_continuous_hours,
                     continuous_hours = continuous_hours,
@@ -816,12 +1301,11 @@ class ElectricalPriceCalc(ad.ADBase):
 
             if continuous_hours_int > 0:
                 difference = max_continuous_hours - continuous_hours_int
-                remove = (difference / on_for_minimum) / self.todayslength * 24
+                remove = (difference / on_for_minimum) * hours_per_slot
                 continuous_hours_int -= remove
 
             if current_max_continuous_hours < max_continuous_hours:
-                td = last_peak_end_time - current.start
-                normal_on_timedelta = (td.days * 24 * 60 + td.seconds // 60) / 60
+                normal_on_timedelta = hours_between(current.start, last_peak_end_time)
                 current_max_continuous_hours += math.ceil(normal_on_timedelta / on_for_minimum)
             elif current_max_continuous_hours > max_continuous_hours:
                 current_max_continuous_hours = max_continuous_hours
@@ -829,6 +1313,7 @@ class ElectricalPriceCalc(ad.ADBase):
             if i == check_index_now and continue_from_peak:
                 continuous_hours += datetime.timedelta(hours = continuous_hours_from_old_calc)
                 saving_hours_list, last_peak_end_time, continuous_hours_int = self._calculate_continuous_hours(
+                    snap,
                     saving_hours_list = saving_hours_list,
                     max_continuous_hours = current_max_continuous_hours,
                     continuous_hours = continuous_hours,
@@ -847,6 +1332,7 @@ class ElectricalPriceCalc(ad.ADBase):
         return saving_hours_list
 
     def _calculate_continuous_hours(self,
+                                    snap,
                                     saving_hours_list,
                                     max_continuous_hours,
                                     continuous_hours,
@@ -857,9 +1343,9 @@ class ElectricalPriceCalc(ad.ADBase):
                                     reset_continuous_hours
                                     ):
         continuous_hours_int += int(math.floor(((continuous_hours.days * 24 * 60 + continuous_hours.seconds // 60) / 60)))
-        peak_list = self._putPeaksInOrder(saving_hours_list)
+        peak_list = self._putPeaksInOrder(snap, saving_hours_list)
         for item in peak_list:
-            continuous_hours_from_list = item.end - item.start
+            continuous_hours_from_list = item.duration
             continuous_hours_from_list_int = int(math.floor((continuous_hours_from_list.days * 24 * 60 + continuous_hours_from_list.seconds // 60) / 60))
             if continuous_hours_from_list_int > continuous_hours_int:
                 continuous_hours_from_list_int = continuous_hours_int
@@ -867,6 +1353,7 @@ class ElectricalPriceCalc(ad.ADBase):
             if continuous_hours_from_list_int > max_continuous_hours:
                 continuous_hours_to_remove = continuous_hours_from_list_int - max_continuous_hours
                 saving_hours_list, last_peak_end_time = self._remove_too_many_continous_hours(
+                    snap,
                     saving_hours_list = saving_hours_list,
                     continuous_hours_to_remove = continuous_hours_to_remove,
                     start_peak_time = item.start,
@@ -880,6 +1367,7 @@ class ElectricalPriceCalc(ad.ADBase):
         return saving_hours_list, last_peak_end_time, continuous_hours_int
 
     def _remove_too_many_continous_hours(self,
+                                         snap,
                                          saving_hours_list,
                                          continuous_hours_to_remove,
                                          start_peak_time,
@@ -888,19 +1376,16 @@ class ElectricalPriceCalc(ad.ADBase):
                                          pricedifference_increase,
                                          reset_continuous_hours
                                          ):
-        start_times = [item.start for item in self.elpricestoday]
-        end_times = [item.end for item in self.elpricestoday]
-
-        index_start = bisect.bisect_left(start_times, start_peak_time)
-        index_end = bisect.bisect_right(end_times, last_peak_end_time)
-        continuous_items_to_remove =  int((continuous_hours_to_remove/24 * self.todayslength))
+        index_start = snap.slots.index_from(start_peak_time)
+        index_end = snap.slots.index_ending_by(last_peak_end_time)
+        continuous_items_to_remove = snap.slots.slot_count(hours = continuous_hours_to_remove, index_start = index_start, round_up = False)
 
         
         # Find the least expencive hour in peak_hour.
         list_with_lower_prices:list = []
-        price_start = self.elpricestoday[index_start].value
-        price_end = self.elpricestoday[index_end].value
-        for i, current in enumerate(self.elpricestoday[index_start:index_end]):
+        price_start = snap.elpricestoday[index_start].value
+        price_end = snap.elpricestoday[index_end].value
+        for i, current in enumerate(snap.elpricestoday[index_start:index_end]):
             if (
                 current.value < price_start
                 and current.value < price_end
@@ -909,11 +1394,11 @@ class ElectricalPriceCalc(ad.ADBase):
                 list_with_lower_prices.append(original_index)
 
         if list_with_lower_prices:
-            sorted_list = sorted(self.elpricestoday[index_start:index_end], key=lambda x: x.value)
+            sorted_list = sorted(snap.elpricestoday[index_start:index_end], key=lambda x: x.value)
             remove_price_below = sorted_list[len(list_with_lower_prices)].value
 
             index_start_corrected = index_start
-            for i, current in enumerate(self.elpricestoday[index_start:index_end]):
+            for i, current in enumerate(snap.elpricestoday[index_start:index_end]):
                 if current.value <= remove_price_below:
                     if current.start in saving_hours_list:
                         saving_hours_list.remove(current.start)
@@ -927,7 +1412,7 @@ class ElectricalPriceCalc(ad.ADBase):
             ):
                 return saving_hours_list, last_peak_end_time
             
-            for current in reversed(self.elpricestoday[index_start_corrected:index_end]):
+            for current in reversed(snap.elpricestoday[index_start_corrected:index_end]):
                 if not current.start in saving_hours_list:
                     index_end -= 1
                     last_peak_end_time = current.start
@@ -942,16 +1427,16 @@ class ElectricalPriceCalc(ad.ADBase):
                 iterations = index_end - index_start
             )
             if (
-                self.elpricestoday[index_start].value > self.elpricestoday[index_end].value + start_pricedrop
+                snap.elpricestoday[index_start].value > snap.elpricestoday[index_end].value + start_pricedrop
             ):
-                if self.elpricestoday[index_end].start in saving_hours_list:
-                    saving_hours_list.remove(self.elpricestoday[index_end].start)
-                    last_peak_end_time = self.elpricestoday[index_end].start
+                if snap.elpricestoday[index_end].start in saving_hours_list:
+                    saving_hours_list.remove(snap.elpricestoday[index_end].start)
+                    last_peak_end_time = snap.elpricestoday[index_end].start
                     continuous_items_to_remove -= 1
                 index_end -= 1
             else:
-                if self.elpricestoday[index_start].start in saving_hours_list:
-                    saving_hours_list.remove(self.elpricestoday[index_start].start)
+                if snap.elpricestoday[index_start].start in saving_hours_list:
+                    saving_hours_list.remove(snap.elpricestoday[index_start].start)
                     continuous_items_to_remove -= 1
                 index_start += 1
             
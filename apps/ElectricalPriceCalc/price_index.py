@@ -0,0 +1,73 @@
+""" Threshold index for electricity price series
+
+    @Pythm / https://github.com/Pythm
+"""
+
+from typing import List, Optional, Tuple
+
+
+class PriceThresholdIndex:
+    """ Sparse tables with lowest and highest price for every block of 2^k slots.
+        Finds next slot at or below / at or above a price in O(log n). """
+
+    def __init__(self, values:list):
+        self.length:int = len(values)
+        self._lowest:List[list] = [list(values)]
+        self._highest:List[list] = [list(values)]
+
+        block = 1
+        while block * 2 <= self.length:
+            lowest = self._lowest[-1]
+            highest = self._highest[-1]
+            self._lowest.append([min(first, second) for first, second in zip(lowest, lowest[block:])])
+            self._highest.append([max(first, second) for first, second in zip(highest, highest[block:])])
+            block *= 2
+
+    def _skip_while(self, table, skip_block, index_start, index_stop) -> Optional[int]:
+        """ Skips blocks while skip_block is True for the block value and returns first index not skipped. """
+
+        index = max(index_start, 0)
+        index_stop = self.length if index_stop is None else min(index_stop, self.length)
+        for level in range(len(table) - 1, -1, -1):
+            block = 1 << level
+            if (
+                index + block <= index_stop
+                and skip_block(table[level][index])
+            ):
+                index += block
+        return index if index < index_stop else None
+
+    def next_at_most(self, price:float, index_start:int = 0, index_stop:int = None) -> Optional[int]:
+        """ Returns index of first slot from index_start with price at or below price. """
+
+        return self._skip_while(self._lowest, lambda lowest: lowest > price, index_start, index_stop)
+
+    def next_at_least(self, price:float, index_start:int = 0, index_stop:int = None) -> Optional[int]:
+        """ Returns index of first slot from index_start with price at or above price. """
+
+        return self._skip_while(self._highest, lambda highest: highest < price, index_start, index_stop)
+
+    def next_above(self, price:float, index_start:int = 0, index_stop:int = None) -> Optional[int]:
+        """ Returns index of first slot from index_start with price above price. """
+
+        return self._skip_while(self._highest, lambda highest: highest <= price, index_start, index_stop)
+
+    def longest_run_at_most(self, price:float, index_start:int = 0, index_stop:int = None) -> Optional[Tuple[int, int]]:
+        """ Returns start index and end index (exclusive) of the longest run of slots at or below price
+            between index_start and index_stop. Earliest run wins ties. Jumps one run at a time,
+            so cost is O(runs * log n). """
+
+        index_stop = self.length if index_stop is None else min(index_stop, self.length)
+        longest = None
+        index = index_start
+        while index < index_stop:
+            run_start = self.next_at_most(price, index, index_stop)
+            if run_start is None:
+                break
+            run_end = self.next_above(price, run_start, index_stop)
+            if run_end is None:
+                run_end = index_stop
+            if longest is None or run_end - run_start > longest[1] - longest[0]:
+                longest = (run_start, run_end)
+            index = run_end
+        return longest
@@ -0,0 +1,75 @@
+""" Reads prices from each source as start, end and price records without changing the raw prices
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import datetime
+from typing import Iterable, Iterator, List, Tuple
+from pydantic_models_price import PriceHour
+
+
+def spot_records(values:Iterable[dict], vat:float, tz) -> Iterator[Tuple]:
+    """ Yields start and end in tz and kWh price with VAT from elspot values in price per MWh. """
+
+    for item in values:
+        yield item['start'].astimezone(tz), item['end'].astimezone(tz), float(item['value']) / 1000 * vat
+
+def integration_records(values:Iterable[dict], convert_utc) -> Iterator[Tuple]:
+    """ Yields start, end and kWh price from raw_today or raw_tomorrow of the Nordpool integration. """
+
+    for item in values:
+        yield convert_utc(item['start']), convert_utc(item['end']), float(item['value'])
+
+def fixed_price_records(start_day:datetime.datetime,
+                        end_day:datetime.datetime,
+                        minutes:int,
+                        price:float
+                        ) -> Iterator[Tuple]:
+    """ Yields slots of minutes length with price from start_day until end_day.
+        Steps in UTC so days with daylight saving changes get 23 or 25 hours. """
+
+    tz = start_day.tzinfo
+    step = datetime.timedelta(minutes = minutes)
+    cur = start_day.astimezone(datetime.timezone.utc)
+    end_utc = end_day.astimezone(datetime.timezone.utc)
+    while cur < end_utc:
+        nxt = min(cur + step, end_utc)
+        yield cur.astimezone(tz), nxt.astimezone(tz), float(price)
+        cur = nxt
+
+def price_records(prices:Iterable[dict]) -> Iterator[Tuple]:
+    """ Yields records from price dicts with start, end and value in kWh price. """
+
+    for item in prices:
+        yield item['start'], item['end'], float(item['value'])
+
+
+class PriceSeries:
+    """ Prices with taxes for one day as PriceHour list, with start and end as seconds since epoch and price in lists beside it. """
+
+    def __init__(self):
+        self.price_hours:List[PriceHour] = []
+        self.starts:list = []
+        self.ends:list = []
+        self.values:list = []
+
+    @classmethod
+    def from_price_hours(cls, price_hours:list) -> 'PriceSeries':
+        series = cls()
+        for item in price_hours:
+            series.append(price_hour = item, start = item.start.timestamp(), end = item.end.timestamp())
+        return series
+
+    def __len__(self) -> int:
+        return len(self.price_hours)
+
+    def append(self, price_hour:PriceHour, start:float, end:float) -> None:
+        self.price_hours.append(price_hour)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.values.append(price_hour.value)
+
+    def slot_lengths(self) -> set:
+        """ Returns the different slot lengths in seconds. """
+
+        return {end - start for start, end in zip(self.starts, self.ends)}
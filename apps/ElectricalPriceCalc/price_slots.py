@@ -0,0 +1,166 @@
+""" Time slots for electricity price series
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import datetime
+import math
+import bisect
+from typing import List, Optional
+from pydantic_models_price import PriceHour
+
+
+def epoch(time) -> float:
+    """ Returns time as seconds since epoch. Accepts aware datetime or seconds. """
+
+    if isinstance(time, datetime.datetime):
+        return time.timestamp()
+    return float(time)
+
+def duration_between(start:datetime.datetime, end:datetime.datetime) -> datetime.timedelta:
+    """ Returns elapsed time from start to end, also when a daylight saving change is between them. """
+
+    return datetime.timedelta(seconds = end.timestamp() - start.timestamp())
+
+def hours_between(start:datetime.datetime, end:datetime.datetime) -> float:
+    """ Returns elapsed hours from start to end in whole minutes. """
+
+    return ((end.timestamp() - start.timestamp()) // 60) / 60
+
+def split_price_hours(price_hours:list, resolution:float) -> List[PriceHour]:
+    """ Splits slots longer than resolution in seconds into slots of resolution length with the same price. """
+
+    step = datetime.timedelta(seconds = resolution)
+    split_prices:list = []
+    for item in price_hours:
+        parts = round((item.end.timestamp() - item.start.timestamp()) / resolution)
+        if parts <= 1:
+            split_prices.append(item)
+            continue
+        tz = item.start.tzinfo
+        start_utc = item.start.astimezone(datetime.timezone.utc)
+        for part in range(parts):
+            split_prices.append(PriceHour(
+                start = (start_utc + step * part).astimezone(tz),
+                end = (start_utc + step * (part + 1)).astimezone(tz),
+                value = item.value
+            ))
+    return split_prices
+
+
+class PriceSlots:
+    """ Start, end and price for each slot in elpricestoday with start and end as seconds since epoch.
+        Converts hours to number of slots by time instead of by day length. Finds slots from time
+        without searching when slots are contiguous with equal length. """
+
+    def __init__(self,
+                 price_hours:list,
+                 todayslength:int,
+                 starts:list = None,
+                 ends:list = None,
+                 values:list = None):
+        # Starts, ends and values are read from price_hours unless given.
+        self.starts:list = starts if starts is not None else [item.start.timestamp() for item in price_hours]
+        self.ends:list = ends if ends is not None else [item.end.timestamp() for item in price_hours]
+        self.values:list = values if values is not None else [item.value for item in price_hours]
+        self.todayslength:int = todayslength
+
+        self.first_start:float = self.starts[0] if self.starts else 0.0
+        self.today_end:float = self.ends[todayslength - 1] if todayslength > 0 else self.first_start
+
+        # Seconds in each slot when series is a regular grid, else None.
+        self.step:Optional[float] = None
+        if self.starts:
+            step = self.ends[0] - self.starts[0]
+            if (
+                step > 0
+                and all(end - start == step for start, end in zip(self.starts, self.ends))
+                and all(end == start for end, start in zip(self.ends, self.starts[1:]))
+            ):
+                self.step = step
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _grid(self, time) -> float:
+        return (epoch(time) - self.first_start) / self.step
+
+    def _clamp(self, index) -> int:
+        return min(max(index, 0), len(self.starts))
+
+    def index_from(self, time) -> int:
+        """ Returns index of first slot starting at or after time. """
+
+        if self.step is None:
+            return bisect.bisect_left(self.starts, epoch(time))
+        return self._clamp(math.ceil(self._grid(time)))
+
+    def index_after(self, time) -> int:
+        """ Returns index of first slot starting after time. """
+
+        if self.step is None:
+            return bisect.bisect_right(self.starts, epoch(time))
+        return self._clamp(math.floor(self._grid(time)) + 1)
+
+    def index_ending_from(self, time) -> int:
+        """ Returns index of first slot ending at or after time. """
+
+        if self.step is None:
+            return bisect.bisect_left(self.ends, epoch(time))
+        return self._clamp(math.ceil(self._grid(time)) - 1)
+
+    def index_ending_by(self, time) -> int:
+        """ Returns number of slots ending at or before time. """
+
+        if self.step is None:
+            return bisect.bisect_right(self.ends, epoch(time))
+        return self._clamp(math.floor(self._grid(time)))
+
+    def index_at(self, time) -> Optional[int]:
+        """ Returns index of slot containing time, or None if time is outside slots. """
+
+        index = self.index_after(time) - 1
+        if (
+            index >= 0
+            and epoch(time) < self.ends[index]
+        ):
+            return index
+        return None
+
+    def hours_per_slot(self, index:int = 0) -> float:
+        """ Returns length in hours of slot at index, or of every slot on a regular grid. """
+
+        if self.step is not None:
+            return self.step / 3600
+        if not self.starts:
+            return 1.0
+        index = min(max(index, 0), len(self.starts) - 1)
+        return (self.ends[index] - self.starts[index]) / 3600
+
+    def slot_count(self,
+                   hours:float,
+                   index_start:int = 0,
+                   round_up:bool = True
+                   ) -> int:
+        """ Returns number of slots from index_start covering hours. Rounds partial slots up,
+            or down with round_up False. Not limited by number of slots left. """
+
+        if self.step is not None:
+            slots = round(hours * 3600 / self.step, 6)
+            return math.ceil(slots) if round_up else math.floor(slots)
+
+        if not self.starts:
+            return 0
+        index_start = min(max(index_start, 0), len(self.starts) - 1)
+        target = self.starts[index_start] + hours * 3600
+        if round_up:
+            index_end = bisect.bisect_left(self.ends, target, lo = index_start)
+            count = index_end - index_start + 1
+        else:
+            count = bisect.bisect_right(self.ends, target, lo = index_start) - index_start
+        if target > self.ends[-1]:
+            # Continue with length of last slot beyond end of series.
+            last_step = self.ends[-1] - self.starts[-1]
+            overflow = round((target - self.ends[-1]) / last_step, 6)
+            count = len(self.starts) - index_start + (math.ceil(overflow) if round_up else math.floor(overflow))
+        return count
@@ -0,0 +1,41 @@
+""" Published electricity prices replaced as a whole on refresh
+
+    @Pythm / https://github.com/Pythm
+"""
+
+from typing import Optional
+from price_slots import PriceSlots
+from price_index import PriceThresholdIndex
+
+
+class PriceSnapshot:
+    """ Prices published by one refresh with the slot model, sorted prices and threshold index made from them.
+        A refresh builds a new snapshot and assigns it once. It is not changed after that, except that
+        cheapest windows and statistics are added on first use, so a query reading the snapshot once
+        gets answers from one set of prices also when prices are refreshed while it runs. """
+
+    def __init__(self,
+                 price_hours:list,
+                 todayslength:int,
+                 starts:list = None,
+                 ends:list = None,
+                 values:list = None,
+                 tomorrow_valid:Optional[bool] = None):
+        self.elpricestoday:list = price_hours
+        self.todayslength:int = todayslength
+        self.slots = PriceSlots(price_hours = price_hours,
+                                todayslength = todayslength,
+                                starts = starts,
+                                ends = ends,
+                                values = values)
+        self.sorted_elprices_today:list = sorted(self.slots.values[:todayslength])
+        self.sorted_elprices_tomorrow:list = sorted(self.slots.values[todayslength:])
+        self.tomorrow_valid:bool = len(price_hours) > todayslength if tomorrow_valid is None else tomorrow_valid
+        self.price_index = PriceThresholdIndex(values = self.slots.values)
+        # Equal for snapshots with the same prices.
+        self.fingerprint:tuple = (todayslength, tuple(self.slots.starts), tuple(self.slots.values))
+
+        # Cheapest windows from the current hour. Rows are built on first lookup.
+        self.cheapest_windows = None
+        # Price statistics per period, built on first use.
+        self.statistics:dict = {}
@@ -0,0 +1,54 @@
+""" Statistics for electricity prices in a period
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import datetime
+import math
+import statistics
+from typing import Iterable
+
+
+class PriceStatistics:
+    """ Min, max, mean, median, spread and volatility of prices in a period, calculated once.
+        Percentiles are read from the sorted prices without sorting again. """
+
+    def __init__(self, values:list, start:datetime.datetime, end:datetime.datetime):
+        self.start:datetime.datetime = start
+        self.end:datetime.datetime = end
+        self.sorted_values:list = sorted(values)
+        self.count:int = len(values)
+        self.min:float = self.sorted_values[0]
+        self.max:float = self.sorted_values[-1]
+        self.mean:float = statistics.fmean(values)
+        self.median:float = self.percentile(50)
+        self.spread:float = self.max - self.min
+        self.stdev:float = statistics.pstdev(values, self.mean)
+        # Standard deviation of price change from one slot to the next.
+        changes = [after - before for before, after in zip(values, values[1:])]
+        self.volatility:float = statistics.pstdev(changes) if changes else 0.0
+
+    def percentile(self, percent:float) -> float:
+        """ Returns price at percent from 0 to 100, interpolated between the closest prices. """
+
+        position = min(max(percent, 0), 100) / 100 * (self.count - 1)
+        below = math.floor(position)
+        above = min(below + 1, self.count - 1)
+        return self.sorted_values[below] + (self.sorted_values[above] - self.sorted_values[below]) * (position - below)
+
+    def as_dict(self, percentiles:Iterable[float] = (10, 25, 75, 90)) -> dict:
+        """ Returns statistics with percentiles given as dict. """
+
+        return {
+            'start': self.start,
+            'end': self.end,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'median': self.median,
+            'spread': self.spread,
+            'stdev': self.stdev,
+            'volatility': self.volatility,
+            'percentiles': {f"{percent:g}": self.percentile(percent) for percent in percentiles},
+        }
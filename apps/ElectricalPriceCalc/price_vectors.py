@@ -0,0 +1,110 @@
+""" Array operations on electricity price series
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import operator
+from typing import List, Tuple
+
+
+def slot_energy_prices(price_hours) -> List[float]:
+    """ Returns price for running 1 kW through each slot; slot price multiplied with slot length in hours. """
+
+    return [
+        item.value * (item.end.timestamp() - item.start.timestamp()) / 3600
+        for item in price_hours
+    ]
+
+def cost_of_load_profiles(energy_prices:list,
+                          load_profiles:list
+                          ) -> List[Tuple[float, List[float]]]:
+    """ Costs load profiles in kW per slot against energy prices in a single pass.
+        Slots beyond the shortest of profile and prices are ignored.
+        Returns list with total cost and cost per slot for each profile. Total of an empty profile is 0.0. """
+
+    mul = operator.mul
+    results:list = []
+    for profile in load_profiles:
+        slot_costs = list(map(mul, profile, energy_prices))
+        results.append((sum(slot_costs, 0.0), slot_costs))
+    return results
+
+def peak_mask(values:list,
+              index_now:int,
+              pricedrop:float,
+              marked:list
+              ) -> List[bool]:
+    """ Marks slots from index_now where price drops at least pricedrop to the next slot,
+        or the slot before where price drops pricedrop x1,3 over two slots.
+        Slots already marked are kept and never suppress the slot before. """
+
+    length = len(values)
+    start = min(max(index_now, 0), length)
+    stop = max(length - 1, 0)
+    drops = [current - after for current, after in zip(values, values[1:])]
+    drops_over_two = [before - after for before, after in zip(values, values[2:])]
+
+    drop_to_next = [False] * length
+    drop_to_next[start:stop] = [drop >= pricedrop for drop in drops[start:stop]]
+
+    # Drop over two slots marks the slot before, unless that slot is handled by a single drop.
+    start_before = max(start, 1)
+    stop_before = max(stop - 1, 0)
+    drop_over_two = [False] * length
+    drop_over_two[start_before - 1:stop_before] = [
+        drop >= pricedrop * 1.3 and (was_marked or not drop_after)
+        for drop, was_marked, drop_after in zip(drops_over_two[start_before - 1:stop_before],
+                                                 marked[start_before:stop],
+                                                 drop_to_next[start_before:stop])
+    ]
+
+    return [
+        was_marked or drop_after or drop_two
+        for was_marked, drop_after, drop_two in zip(marked, drop_to_next, drop_over_two)
+    ]
+
+def spend_mask(values:list,
+               index_now:int,
+               priceincrease:float,
+               lowest_prices:list
+               ) -> List[bool]:
+    """ Marks slots from index_now that are below lowest_prices and followed by an increase of at least
+        priceincrease, together with a cheaper slot before. Also marks the slot before when price
+        increases priceincrease x1,4 over two slots. """
+
+    length = len(values)
+    start = min(max(index_now, 0), length)
+    stop = max(length - 2, 0)
+    rises = [after - current for current, after in zip(values, values[1:])]
+    rises_over_two = [after - before for before, after in zip(values, values[2:])]
+
+    increase = [False] * length
+    increase[start:stop] = [
+        rise >= priceincrease and current <= lowest
+        for rise, current, lowest in zip(rises[start:stop], values[start:stop], lowest_prices[start:stop])
+    ]
+
+    start_before = max(start, 1)
+    stop_before = max(stop - 1, 0)
+    before_increase = [
+        (is_increase and rise_before > 0)
+        or (
+            not is_increase
+            and rise >= priceincrease * 0.6
+            and rise_two >= priceincrease * 1.4
+            and before <= lowest
+        )
+        for is_increase, rise_before, rise, rise_two, before, lowest in zip(increase[start_before:stop],
+                                                                          rises[start_before - 1:stop_before],
+                                                                          rises[start_before:stop],
+                                                                          rises_over_two[start_before - 1:stop_before],
+                                                                          values[start_before - 1:stop_before],
+                                                                          lowest_prices[start_before:stop])
+    ]
+
+    mask = list(increase)
+    mask[start_before - 1:stop_before] = [
+        is_increase or is_before
+        for is_increase, is_before in zip(mask[start_before - 1:stop_before], before_increase)
+    ]
+    return mask
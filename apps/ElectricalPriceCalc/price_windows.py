@@ -0,0 +1,102 @@
+""" Cheapest continuous windows for electricity price series
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import operator
+import time
+from array import array
+from functools import reduce
+from typing import Optional, Tuple
+
+
+class CheapestWindowTable:
+    """ Cheapest window of every duration for every deadline, with windows starting at or after index_start.
+        Holds start index, sum and highest price of the window as a scan from index_start would find it;
+        sums are added in slot order and the earliest window wins ties.
+        The row for a duration is built on its first lookup. Window sums do not depend on index_start,
+        so tables made with from_start for a later start reuse them. """
+
+    def __init__(self, values:list, index_start:int, window_sums:dict = None):
+        self.values:list = values
+        self.index_start:int = max(index_start, 0)
+        self.length:int = len(values)
+        # Sum of window per duration as (first start, sums from first start), shared by tables from_start.
+        self._window_sums:dict = window_sums if window_sums is not None else {}
+        # Start, sum and highest price per duration, indexed by deadline - index_start - duration.
+        self._rows:dict = {}
+        self.build_seconds:float = 0.0
+
+    def from_start(self, index_start:int) -> 'CheapestWindowTable':
+        """ Returns table for the same prices with windows starting at or after index_start. """
+
+        return CheapestWindowTable(values = self.values, index_start = index_start, window_sums = self._window_sums)
+
+    def lookup(self, duration:int, index_end:int) -> Optional[Tuple[int, float, float]]:
+        """ Returns start index, sum and highest price for the cheapest window of duration slots
+            ending at or before index_end (exclusive), or None if no window fits. """
+
+        if (
+            duration < 1
+            or duration > self.length - self.index_start
+        ):
+            return None
+        position = min(index_end, self.length) - self.index_start - duration
+        if position < 0:
+            return None
+        row = self._rows.get(duration)
+        if row is None:
+            row = self._build_row(duration)
+        starts, sums, highest = row
+        start = starts[position]
+        if start < 0:
+            return None
+        return start, sums[position], highest[position]
+
+    def _sums(self, duration:int) -> tuple:
+        first_start, sums = self._window_sums.get(duration, (None, None))
+        if (
+            first_start is None
+            or first_start > self.index_start
+        ):
+            first_start = self.index_start
+            values = self.values
+            sums = array('d', (reduce(operator.add, values[start:start + duration], 0.0)
+                               for start in range(first_start, self.length - duration + 1)))
+            self._window_sums[duration] = (first_start, sums)
+        return first_start, sums
+
+    def _build_row(self, duration:int) -> tuple:
+        started = time.perf_counter()
+        first_start, window_sums = self._sums(duration)
+        best_start = -1
+        best_sum = 1000.0
+        best_highest = 0.0
+        starts = array('i')
+        sums = array('d')
+        highest = array('d')
+        for start in range(self.index_start, self.length - duration + 1):
+            window_sum = window_sums[start - first_start]
+            if window_sum < best_sum:
+                best_start = start
+                best_sum = window_sum
+                best_highest = max(self.values[start:start + duration])
+            starts.append(best_start)
+            sums.append(best_sum)
+            highest.append(best_highest)
+        row = (starts, sums, highest)
+        self._rows[duration] = row
+        self.build_seconds += time.perf_counter() - started
+        return row
+
+    @property
+    def entries(self) -> int:
+        return sum(len(starts) for starts, _, _ in list(self._rows.values()))
+
+    @property
+    def memory_bytes(self) -> int:
+        """ Returns bytes held by the rows built so far and the window sums they use. """
+
+        arrays = [row for rows in list(self._rows.values()) for row in rows]
+        arrays += [sums for _, sums in list(self._window_sums.values())]
+        return sum(values.buffer_info()[1] * values.itemsize for values in arrays)
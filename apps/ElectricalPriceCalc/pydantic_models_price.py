@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from typing import List
 from pydantic import BaseModel
 
 
@@ -10,4 +11,10 @@ class PeakHour(BaseModel):
 class PriceHour(BaseModel):
     start: datetime
     end: datetime
-    value: float
\ No newline at end of file
+    value: float
+
+class LoadProfileCost(BaseModel):
+    start: datetime
+    end: datetime
+    total: float
+    slot_costs: List[float]
@@ -0,0 +1,300 @@
+""" Local query server for consumers outside AppDaemon
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import asyncio
+import datetime
+import functools
+import json
+import os
+import threading
+from urllib.parse import parse_qsl, urlsplit
+
+
+class QueryError(ValueError):
+    """ Bad query parameter. Answered with status 400. """
+
+
+class QueryServer:
+    """ HTTP/1.1 server on localhost or a Unix socket answering price queries with compact JSON.
+        Runs its own asyncio loop in a thread and keeps connections open between requests.
+        Queries run in the loop's executor, so app methods calling the AppDaemon API are not
+        called from this loop and a slow query does not hold up other connections. """
+
+    STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+    def __init__(self,
+                 app,
+                 host:str = '127.0.0.1',
+                 port:int = 8765,
+                 path:str = None,
+                 idle_timeout:float = 60,
+                 max_sessions:int = 16):
+        self.app = app
+        self.host:str = host
+        self.port:int = port
+        self.path:str = path
+        self.idle_timeout:float = idle_timeout
+        # Save hours sessions created by clients, kept apart from sessions of other apps.
+        self.max_sessions:int = max_sessions
+        self._sessions:set = set()
+        self._sessions_lock = threading.Lock()
+
+        self.routes:dict = {
+            '/prices': self._prices,
+            '/price': self._price,
+            '/cheapest': self._cheapest,
+            '/lowest': self._lowest,
+            '/save': self._save,
+            '/spend': self._spend,
+            '/statistics': self._statistics,
+        }
+        self._loop = None
+        self._thread = None
+        self._server = None
+        # Published price snapshot and encoded /prices response for it.
+        self._prices_cache:tuple = (None, b'')
+
+    def start(self) -> None:
+        """ Starts server in a new thread and waits until it listens. """
+
+        started = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target = self._run, args = (started,), name = 'ElectricalPriceCalc query server', daemon = True)
+        self._thread.start()
+        started.wait(timeout = 10)
+
+    def stop(self) -> None:
+        """ Stops server and closes open connections. """
+
+        if (
+            self._loop is not None
+            and self._loop.is_running()
+        ):
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout = 10)
+
+    def _run(self, started:threading.Event) -> None:
+        loop = self._loop
+        asyncio.set_event_loop(loop)
+        try:
+            if self.path:
+                self._server = loop.run_until_complete(asyncio.start_unix_server(self._handle, path = self.path))
+            else:
+                self._server = loop.run_until_complete(asyncio.start_server(self._handle, host = self.host, port = self.port))
+                self.port = self._server.sockets[0].getsockname()[1]
+        except OSError as e:
+            self.app.ADapi.log(f"Could not start query server: {e}", level = 'WARNING')
+            started.set()
+            loop.close()
+            return
+
+        self.app.ADapi.log(f"Query server listening on {self.path or f'{self.host}:{self.port}'}", level = 'INFO')
+        started.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions = True))
+            loop.close()
+            if self.path:
+                try:
+                    os.unlink(self.path)
+                except OSError:
+                    pass
+
+    async def _handle(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        """ Answers requests on one connection until client closes it, asks to close or is idle. """
+
+        try:
+            while True:
+                request_line = await asyncio.wait_for(reader.readline(), timeout = self.idle_timeout)
+                if not request_line:
+                    break
+                headers:dict = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip().lower()
+                try:
+                    content_length = int(headers.get('content-length', 0))
+                except ValueError:
+                    writer.write(self._response(status = 400, body = b'{"error":"bad content length"}', keep_alive = False))
+                    break
+                if content_length > 0:
+                    await reader.readexactly(content_length)
+
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    writer.write(self._response(status = 400, body = b'{"error":"bad request line"}', keep_alive = False))
+                    break
+                keep_alive = (
+                    headers.get('connection') != 'close'
+                    if version == 'HTTP/1.1'
+                    else headers.get('connection') == 'keep-alive'
+                )
+                status, body = await asyncio.get_running_loop().run_in_executor(
+                    None, functools.partial(self._answer, method = method, target = target))
+                writer.write(self._response(status = status, body = body, keep_alive = keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.CancelledError, asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _response(self, status:int, body:bytes, keep_alive:bool) -> bytes:
+        return (
+            f"HTTP/1.1 {status} {self.STATUS[status]}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        ).encode('latin-1') + body
+
+    def _answer(self, method:str, target:str) -> tuple:
+        """ Returns status and JSON body for request. """
+
+        if method != 'GET':
+            return 405, encode({'error': 'only GET is supported'})
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return 404, encode({'error': f"unknown path {url.path}", 'paths': list(self.routes)})
+        try:
+            return 200, route(dict(parse_qsl(url.query)))
+        except QueryError as e:
+            return 400, encode({'error': str(e)})
+        except Exception as e:
+            self.app.ADapi.log(f"Query server failed on {target}. Exception: {e}", level = 'WARNING')
+            return 500, encode({'error': str(e)})
+
+    # Queries. Each takes query parameters and returns encoded body.
+    def _prices(self, params:dict) -> bytes:
+        """ Published prices as first start, slot length in minutes and one list of prices per day. """
+
+        snap = self.app._snapshot
+        cached_snap, body = self._prices_cache
+        if snap is not cached_snap:
+            slots = snap.slots
+            values = slots.values
+            body = encode({
+                'start': snap.elpricestoday[0].start if snap.elpricestoday else None,
+                'resolution': slots.step / 60 if slots.step is not None else None,
+                'today': values[:snap.todayslength],
+                'tomorrow': values[snap.todayslength:],
+                'tomorrow_valid': snap.tomorrow_valid,
+            })
+            self._prices_cache = (snap, body)
+        return body
+
+    def _price(self, params:dict) -> bytes:
+        return encode({'price': self.app.electricity_price_now(time = _time(params, 'time'))})
+
+    def _cheapest(self, params:dict) -> bytes:
+        start, end, price = self.app.get_Continuous_Cheapest_Time(
+            hoursTotal = _positive(params, 'hours', 2),
+            calculateBeforeNextDayPrices = _bool(params, 'before_next_day_prices', False),
+            finishByHour = _number(params, 'finish_by_hour', 7, int),
+            startBeforePrice = _number(params, 'start_before_price', 0.01),
+            stopAtPriceIncrease = _number(params, 'stop_at_price_increase', 0.01)
+        )
+        return encode({'start': start, 'end': end, 'price': price})
+
+    def _lowest(self, params:dict) -> bytes:
+        return encode({'price': self.app.get_lowest_prices(
+            checkitem = _number(params, 'checkitem', 1, int),
+            hours = _positive(params, 'hours', 6),
+            min_change = _number(params, 'min_change', None)
+        )})
+
+    def _save(self, params:dict) -> bytes:
+        """ Save hours from a session when parameter session names one, else calculated from now.
+            Clients can create up to max_sessions sessions. """
+
+        settings = {
+            'pricedrop': _number(params, 'pricedrop', 0.08),
+            'max_continuous_hours': _positive(params, 'max_continuous_hours', 12),
+            'on_for_minimum': _positive(params, 'on_for_minimum', 6),
+            'pricedifference_increase': _number(params, 'pricedifference_increase', 1.07),
+            'reset_continuous_hours': _bool(params, 'reset_continuous_hours', False),
+            'planner': params.get('planner', 'heuristic'),
+        }
+        if settings['planner'] not in ('heuristic', 'optimal'):
+            raise QueryError("planner must be heuristic or optimal")
+        if 'session' in params:
+            name = f"query_server.{params['session']}"
+            with self._sessions_lock:
+                if name not in self._sessions:
+                    if len(self._sessions) >= self.max_sessions:
+                        raise QueryError(f"at most {self.max_sessions} sessions can be created")
+                    self._sessions.add(name)
+            periods = self.app.get_save_session(name = name, **settings).find_times_to_save()
+        else:
+            periods = self.app.find_times_to_save(previous_save_hours = [], **settings)
+        return encode({'periods': [[period.start, period.end] for period in periods]})
+
+    def _spend(self, params:dict) -> bytes:
+        periods = self.app.find_times_to_spend(priceincrease = _number(params, 'priceincrease', 0.5))
+        return encode({'periods': [[period.start, period.end] for period in periods]})
+
+    def _statistics(self, params:dict) -> bytes:
+        period = params.get('period', 'today')
+        if period not in ('today', 'tomorrow', 'next_24h'):
+            raise QueryError("period must be today, tomorrow or next_24h")
+        try:
+            percentiles = [float(percent) for percent in params.get('percentiles', '10,25,75,90').split(',') if percent]
+        except ValueError:
+            raise QueryError("percentiles must be numbers separated by comma")
+        price_statistics = self.app.get_price_statistics(period = period)
+        return encode(price_statistics.as_dict(percentiles = percentiles) if price_statistics is not None else None)
+
+
+def encode(data) -> bytes:
+    """ Returns data as JSON without whitespace. Datetimes are written in ISO format. """
+
+    return json.dumps(data, separators = (',', ':'), default = _isoformat).encode('utf-8')
+
+def _isoformat(value) -> str:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _number(params:dict, name:str, default, kind = float):
+    if name not in params:
+        return default
+    try:
+        return kind(params[name])
+    except ValueError:
+        raise QueryError(f"{name} must be a number")
+
+def _positive(params:dict, name:str, default, kind = float):
+    number = _number(params, name, default, kind)
+    if not number > 0:
+        raise QueryError(f"{name} must be above 0")
+    return number
+
+def _bool(params:dict, name:str, default:bool) -> bool:
+    if name not in params:
+        return default
+    return params[name].lower() in ('1', 'true', 'yes', 'on')
+
+def _time(params:dict, name:str):
+    if name not in params:
+        return None
+    try:
+        # Plus in UTC offset is decoded as space when not percent encoded.
+        time = datetime.datetime.fromisoformat(params[name].replace(' ', '+'))
+    except ValueError:
+        raise QueryError(f"{name} must be an ISO time")
+    if time.tzinfo is None:
+        raise QueryError(f"{name} must include UTC offset")
+    return time
@@ -0,0 +1,103 @@
+""" Dynamic programming planner for save hours
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import math
+from itertools import accumulate
+from typing import List
+
+
+def plan_save_slots(values:list,
+                    index_start:int,
+                    pricedrop:float,
+                    increase_per_slot:float,
+                    max_slots:int,
+                    recovery_slots:int,
+                    used_slots:int = 0,
+                    on_slots:int = 0
+                    ) -> List[int]:
+    """ Finds slots to turn off that give the highest avoided cost, in O(n * max_slots).
+
+        An off period from slot a until slot b, where consumption resumes, avoids
+        price[i] - price[b] - pricedrop * increase_per_slot ** (b - 1 - i) for every slot i in the period.
+        Off periods are at most max_slots long and must be followed by recovery_slots * length / max_slots
+        slots on, and at least one, before the next. used_slots is the length of the last off period before index_start
+        and on_slots how many slots the device has been on since it ended. With on_slots 0 the device is still off
+        and the first period may continue it from index_start. Returns indexes of slots to turn off. """
+
+    length = len(values)
+    index_start = max(index_start, 0)
+    if (
+        max_slots < 1
+        or index_start >= length - 1
+    ):
+        return []
+
+    prefix = list(accumulate(values, initial = 0.0))
+    required = list(accumulate((pricedrop * increase_per_slot ** slot for slot in range(max_slots)), initial = 0.0))
+    # Slots on after an off period, including the slot where consumption resumes.
+    recovery = [max(math.ceil(recovery_slots * slots / max_slots), 1) for slots in range(max_slots + 1)]
+
+    def gain(start, resume):
+        slots = resume - start
+        return prefix[resume] - prefix[start] - slots * values[resume] - required[slots]
+
+    # best[i] is the highest avoided cost from slot i when a new off period may start at i.
+    best = [0.0] * (length + 1)
+    choice = [0] * (length + 1)
+    for index in range(length - 2, index_start - 1, -1):
+        best[index] = best[index + 1]
+        for slots in range(1, min(max_slots, length - 1 - index) + 1):
+            total = gain(index, index + slots) + best[min(index + slots + recovery[slots], length)]
+            if total > best[index]:
+                best[index] = total
+                choice[index] = slots
+
+    plan_from = index_start
+    off_slots:list = []
+    used_slots = min(max(used_slots, 0), max_slots)
+    if (
+        used_slots > 0
+        and on_slots > 0
+    ):
+        # Last off period has ended. Stay on until recovered, counted from where it ended.
+        plan_from = min(index_start + max(recovery[used_slots] - on_slots, 0), length)
+    elif used_slots > 0:
+        # Either continue the current off period from index_start, or stay on until recovered.
+        plan_from = min(index_start + recovery[used_slots], length)
+        continue_slots = 0
+        continue_total = best[plan_from]
+        for slots in range(1, min(max_slots - used_slots, length - 1 - index_start) + 1):
+            total = (gain(index_start, index_start + slots)
+                     + best[min(index_start + slots + recovery[used_slots + slots], length)])
+            if total > continue_total:
+                continue_total = total
+                continue_slots = slots
+        if continue_slots > 0:
+            off_slots.extend(range(index_start, index_start + continue_slots))
+            plan_from = min(index_start + continue_slots + recovery[used_slots + continue_slots], length)
+
+    index = plan_from
+    while index < length - 1:
+        slots = choice[index]
+        if slots == 0:
+            index += 1
+            continue
+        off_slots.extend(range(index, index + slots))
+        index += slots + recovery[slots]
+    return off_slots
+
+def avoided_cost(values:list, off_slots:list) -> float:
+    """ Returns price saved by moving consumption in off_slots to the slot where each off period ends. """
+
+    off = set(off_slots)
+    saved = 0.0
+    period:list = []
+    for index, value in enumerate(values):
+        if index in off:
+            period.append(value)
+        elif period:
+            saved += sum(period) - len(period) * value
+            period = []
+    return saved
@@ -0,0 +1,161 @@
+""" Save hours kept between calculations for one consumer
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import math
+import threading
+from typing import List
+from pydantic_models_price import PeakHour
+
+
+class SaveHoursSession:
+    """ Save hours for one consumer. Keeps elapsed save hours and hours used of max_continuous_hours,
+        and moves them forward slot by slot instead of reading previous save hours on every call.
+        Save hours are calculated again only when settings change or new prices differ from the current slot on.
+        Then they are calculated for all slots from the current slot, since both planners weigh each peak
+        against prices later in the series, and a change in tomorrow's prices can move save hours this evening.
+        Elapsed save hours are kept. New prices equal from the current slot on, like at midnight, keep the plan.
+        Calls from several threads, like AppDaemon callbacks and the query server, take turns. """
+
+    def __init__(self,
+                 app,
+                 pricedrop:float,
+                 max_continuous_hours:int,
+                 on_for_minimum:int,
+                 pricedifference_increase:float,
+                 reset_continuous_hours:bool = False,
+                 planner:str = 'heuristic'):
+        self.app = app
+        self.pricedrop:float = pricedrop
+        self.max_continuous_hours:int = max_continuous_hours
+        self.on_for_minimum:int = on_for_minimum
+        self.pricedifference_increase:float = pricedifference_increase
+        self.reset_continuous_hours:bool = reset_continuous_hours
+        self.planner:str = planner
+
+        # Hours off counted against max_continuous_hours, reduced while on.
+        self.continuous_hours:float = 0.0
+        # Length of current or last off period.
+        self.period_hours:float = 0.0
+        self.save_hours:List[PeakHour] = []
+
+        self._elapsed:list = []
+        self._planned:set = set()
+        self._last_off:bool = False
+        self._changed:bool = True
+
+        # Price snapshot the save hours are calculated from and first slot not yet elapsed.
+        self._snap = None
+        self._index_now:int = 0
+        self._lock = threading.Lock()
+
+    def update(self, **settings) -> None:
+        """ Changes settings given as keyword arguments. Save hours are calculated again on next call if any changed. """
+
+        with self._lock:
+            for name, value in settings.items():
+                if getattr(self, name) != value:
+                    setattr(self, name, value)
+                    self._changed = True
+
+    def find_times_to_save(self) -> List[PeakHour]:
+        """ Returns save hours as list of PeakHour, including elapsed save hours still in prices. """
+
+        with self._lock:
+            return self._find_times_to_save()
+
+    def _find_times_to_save(self) -> List[PeakHour]:
+        app = self.app
+        snap = app._snapshot
+        if not snap.elpricestoday:
+            return []
+        if self._snap is not None:
+            self._advance(index_now = self._snap.slots.index_from(app._hour_now()))
+        if self._changed:
+            self._calculate(snap)
+        elif self._snap is not snap:
+            if self._same_prices_from_now(snap):
+                self._move_to(snap)
+            else:
+                self._calculate(snap)
+        return self.save_hours
+
+    def _advance(self, index_now:int) -> None:
+        """ Moves elapsed slots from planned to elapsed save hours and counts continuous hours. """
+
+        slots = self._snap.slots
+        for index in range(self._index_now, min(index_now, len(slots))):
+            start = self._snap.elpricestoday[index].start
+            hours = slots.hours_per_slot(index)
+            if start in self._planned:
+                self._elapsed.append(start)
+                if not self.reset_continuous_hours:
+                    if not self._last_off:
+                        self.period_hours = 0.0
+                    self.period_hours += hours
+                    self.continuous_hours += hours
+                self._last_off = True
+            else:
+                if (
+                    self.period_hours > 0
+                    and self.continuous_hours > 0
+                ):
+                    on_for_minimum = self.on_for_minimum * slots.hours_per_slot(index)
+                    self.continuous_hours -= (self.max_continuous_hours - self.period_hours) / on_for_minimum * hours
+                    if self.continuous_hours < 0:
+                        self.continuous_hours = 0.0
+                self._last_off = False
+        self._index_now = max(self._index_now, index_now)
+
+    def _same_prices_from_now(self, snap) -> bool:
+        """ Returns True if snap has the same slots and prices from the current slot as the save hours are calculated from. """
+
+        hour_now = self.app._hour_now()
+        slots = self._snap.slots
+        index_now = slots.index_from(hour_now)
+        new_slots = snap.slots
+        new_index_now = new_slots.index_from(hour_now)
+        return (
+            slots.starts[index_now:] == new_slots.starts[new_index_now:]
+            and slots.values[index_now:] == new_slots.values[new_index_now:]
+        )
+
+    def _move_to(self, snap) -> None:
+        """ Keeps planned save hours with prices in snap. """
+
+        first_start = snap.elpricestoday[0].start
+        self._elapsed = [start for start in self._elapsed if start >= first_start]
+        self.save_hours = self.app._putPeaksInOrder(snap, self._planned)
+        self._snap = snap
+        self._index_now = snap.slots.index_from(self.app._hour_now())
+
+    def _calculate(self, snap) -> None:
+        app = self.app
+        prices = snap.elpricestoday
+        slots = snap.slots
+        index_now = slots.index_from(app._hour_now())
+
+        first_start = prices[0].start
+        self._elapsed = [start for start in self._elapsed if start >= first_start]
+        self.save_hours = app._find_times_to_save(
+            snap,
+            index_now = index_now,
+            saving_hours_list = list(self._elapsed),
+            continuous_hours_from_old_calc = math.ceil(self.continuous_hours),
+            pricedrop = self.pricedrop,
+            max_continuous_hours = self.max_continuous_hours,
+            on_for_minimum = self.on_for_minimum,
+            pricedifference_increase = self.pricedifference_increase,
+            reset_continuous_hours = self.reset_continuous_hours,
+            planner = self.planner
+        )
+        self._planned = {
+            item.start
+            for peak in self.save_hours
+            for item in prices[slots.index_from(peak.start):slots.index_ending_by(peak.end)]
+        }
+
+        self._snap = snap
+        self._changed = False
+        self._index_now = index_now
@@ -0,0 +1,132 @@
+""" Publishes prices and schedules to Home Assistant sensors
+
+    @Pythm / https://github.com/Pythm
+"""
+
+from typing import Optional, Tuple
+
+
+class SensorPublisher:
+    """ Sets Home Assistant sensors with price now, price series, cheapest window and save and spend hours.
+        Called when prices are published and at start of every slot. Builds all sensors before writing,
+        and writes only sensors where state or attributes changed since last write. """
+
+    def __init__(self,
+                 app,
+                 prefix:str = 'electricalpricecalc',
+                 cheapest_hours:float = 3,
+                 save:dict = None,
+                 spend:dict = None,
+                 decimals:int = 4):
+        self.app = app
+        self.prefix:str = prefix
+        self.cheapest_hours:float = cheapest_hours
+        self.save:Optional[dict] = save
+        self.spend:Optional[dict] = spend
+        self.decimals:int = decimals
+
+        # State and attributes last written per entity.
+        self._published:dict = {}
+        self.writes:int = 0
+
+    def entity_id(self, name:str) -> str:
+        return f"sensor.{self.prefix}_{name}"
+
+    def publish(self, event, data, kwargs) -> None:
+        """ Listener for new prices and slot changes. Price series only changes with new prices. """
+
+        app = self.app
+        snap = app._snapshot
+        if not snap.elpricestoday:
+            return
+        index_now = snap.slots.index_from(app._hour_now())
+
+        sensors = {
+            'price': self._price_sensor(slot = data['slot']),
+            'cheapest_window': self._cheapest_window_sensor(snap, index_now = index_now),
+        }
+        if (
+            event == 'prices'
+            or self.entity_id('prices') not in self._published
+        ):
+            sensors['prices'] = self._prices_sensor(snap)
+        if self.save is not None:
+            save_hours = app.get_save_session(name = self.entity_id('save_hours'), **self.save).find_times_to_save()
+            sensors['save_hours'] = self._periods_sensor(periods = save_hours, name = 'Save hours')
+        if self.spend is not None:
+            sensors['spend_hours'] = self._periods_sensor(periods = app.find_times_to_spend(**self.spend), name = 'Spend hours')
+
+        for name, (state, attributes) in sensors.items():
+            self._write(entity_id = self.entity_id(name), state = state, attributes = attributes)
+
+    def _write(self, entity_id:str, state, attributes:dict) -> None:
+        if self._published.get(entity_id) == (state, attributes):
+            return
+        try:
+            self.app.ADapi.set_state(entity_id, state = state, attributes = attributes)
+        except Exception as e:
+            self.app.ADapi.log(f"Could not set state of {entity_id}. Exception: {e}", level = 'WARNING')
+            return
+        self._published[entity_id] = (state, attributes)
+        self.writes += 1
+
+    def _price(self, value:float) -> float:
+        return round(value, self.decimals)
+
+    def _price_sensor(self, slot) -> Tuple:
+        return (
+            self._price(slot.value) if slot is not None else 'unknown',
+            {
+                'friendly_name': 'Electricity price',
+                'unit_of_measurement': f"{self.app.currency}/kWh",
+                'start': slot.start.isoformat() if slot is not None else None,
+                'end': slot.end.isoformat() if slot is not None else None,
+            }
+        )
+
+    def _prices_sensor(self, snap) -> Tuple:
+        """ Price series as first start, slot length in minutes and one list of prices per day. """
+
+        values = [self._price(value) for value in snap.slots.values]
+        attributes = {
+            'friendly_name': 'Electricity prices',
+            'unit_of_measurement': f"{self.app.currency}/kWh",
+            'start': snap.elpricestoday[0].start.isoformat(),
+            'resolution': snap.slots.step / 60 if snap.slots.step is not None else None,
+            'today': values[:snap.todayslength],
+            'tomorrow': values[snap.todayslength:],
+            'tomorrow_valid': snap.tomorrow_valid,
+        }
+        if snap.slots.step is None:
+            attributes['starts'] = [item.start.isoformat() for item in snap.elpricestoday]
+        return len(values), attributes
+
+    def _cheapest_window_sensor(self, snap, index_now:int) -> Tuple:
+        """ Cheapest continuous cheapest_hours from the current hour until end of prices. """
+
+        duration = snap.slots.slot_count(hours = self.cheapest_hours, index_start = index_now)
+        window = self.app._get_cheapest_windows(snap, index_start = index_now).lookup(duration = duration,
+                                                                                     index_end = len(snap.elpricestoday))
+        attributes = {
+            'friendly_name': 'Cheapest window',
+            'device_class': 'timestamp',
+            'hours': self.cheapest_hours,
+        }
+        if window is None:
+            return 'unknown', attributes
+        start, total, highest = window
+        attributes['end'] = snap.elpricestoday[start + duration - 1].end.isoformat()
+        attributes['average'] = self._price(total / duration)
+        attributes['highest'] = self._price(highest)
+        return snap.elpricestoday[start].start.isoformat(), attributes
+
+    def _periods_sensor(self, periods:list, name:str) -> Tuple:
+        """ Number of periods as state and periods as [start, end] pairs. """
+
+        return (
+            len(periods),
+            {
+                'friendly_name': name,
+                'periods': [[period.start.isoformat(), period.end.isoformat()] for period in periods],
+            }
+        )
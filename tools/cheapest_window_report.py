@@ -0,0 +1,85 @@
+""" Reports build time, memory and amortized lookup cost for the cheapest window table
+
+    Usage: python tools/cheapest_window_report.py [repeats] [lookups per hour]
+
+    Prices are in 15 minute slots, 96 for today and 192 with tomorrow. Rows are built on first lookup,
+    so the amortized cost is measured over a day: the start moves one hour forward at a time, like
+    the app does, and each hour looks up windows of a few durations.
+    The time includes building rows and window sums. The full table has a row for every duration.
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'apps', 'ElectricalPriceCalc'))
+
+from price_windows import CheapestWindowTable
+
+
+SLOTS_PER_HOUR = 4
+
+
+def full_table(values:list) -> CheapestWindowTable:
+    table = CheapestWindowTable(values = values, index_start = 0)
+    for duration in range(1, len(values) + 1):
+        table.lookup(duration = duration, index_end = len(values))
+    return table
+
+def day_of_lookups(values:list, lookups_per_hour:int, durations:list, rng:random.Random) -> tuple:
+    """ Returns seconds, lookups and peak bytes of table for a day starting from each hour. """
+
+    table = None
+    seconds = 0.0
+    lookups = 0
+    peak = 0
+    for index_start in range(0, min(24 * SLOTS_PER_HOUR, len(values)), SLOTS_PER_HOUR):
+        started = time.perf_counter()
+        table = (CheapestWindowTable(values = values, index_start = index_start)
+                 if table is None else table.from_start(index_start))
+        for _ in range(lookups_per_hour):
+            table.lookup(duration = rng.choice(durations), index_end = rng.randint(index_start + 1, len(values)))
+        seconds += time.perf_counter() - started
+        lookups += lookups_per_hour
+        peak = max(peak, table.memory_bytes)
+    return seconds, lookups, peak
+
+def report(slots:int, repeats:int, lookups_per_hour:int) -> None:
+    rng = random.Random(1)
+    values = [round(rng.uniform(-0.2, 3.0), 3) for _ in range(slots)]
+
+    build_seconds = []
+    for _ in range(repeats):
+        build_seconds.append(full_table(values).build_seconds)
+    tracemalloc.start()
+    table = full_table(values)
+    full_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Durations of 1, 2, 3 and 4 hours, as asked by heaters and chargers.
+    durations = [hours * SLOTS_PER_HOUR for hours in (1, 2, 3, 4)]
+    day_seconds = []
+    for _ in range(repeats):
+        seconds, lookups, day_bytes = day_of_lookups(values, lookups_per_hour, durations, rng)
+        day_seconds.append(seconds)
+    median_day = sorted(day_seconds)[len(day_seconds) // 2]
+
+    print(
+        f"{slots:4d} slots: full table {table.entries:6d} entries "
+        f"{sorted(build_seconds)[len(build_seconds) // 2] * 1000:6.1f} ms "
+        f"{table.memory_bytes / 1024:5.0f} kB, peak {full_peak / 1024:5.0f} kB | "
+        f"day {lookups} lookups {median_day * 1000:6.1f} ms, "
+        f"amortized {median_day / lookups * 1e6:5.1f} us per lookup, "
+        f"largest table {day_bytes / 1024:4.0f} kB"
+    )
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    lookups_per_hour = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    for slots in (96, 192):
+        report(slots = slots, repeats = repeats, lookups_per_hour = lookups_per_hour)
@@ -0,0 +1,106 @@
+""" Checks the optimal save planner against trying every set of slots on short price series
+
+    Usage: python tools/check_save_planner.py [checks]
+
+    Every plan must keep the off period and recovery rules, also when an earlier off period is still
+    running or has ended shortly before planning starts, and avoid as much cost as the best valid set.
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'apps', 'ElectricalPriceCalc'))
+
+from save_planner import plan_save_slots
+
+
+PRICEDROP = 0.1
+INCREASE_PER_SLOT = 1.05
+
+
+def recovery(recovery_slots:int, max_slots:int, slots:int) -> int:
+    return max(math.ceil(recovery_slots * slots / max_slots), 1)
+
+def plan_value(values:list, off_slots:list, max_slots:int, recovery_slots:int, used_slots:int, on_slots:int):
+    """ Returns avoided cost of off_slots, or None if they break a rule. """
+
+    off = set(off_slots)
+    last_end = -on_slots if used_slots > 0 else None
+    last_slots = used_slots
+    total = 0.0
+    index = 0
+    while index < len(values):
+        if index not in off:
+            index += 1
+            continue
+        start = index
+        while index in off:
+            index += 1
+        if index >= len(values):
+            return None
+        slots = index - start
+        if (
+            start == 0
+            and used_slots > 0
+            and on_slots == 0
+        ):
+            # Continues the off period running when planning starts.
+            slots += used_slots
+        elif (
+            last_end is not None
+            and start - last_end < recovery(recovery_slots, max_slots, last_slots)
+        ):
+            return None
+        if slots > max_slots:
+            return None
+        total += sum(values[slot] - values[index] - PRICEDROP * INCREASE_PER_SLOT ** (index - 1 - slot)
+                     for slot in range(start, index))
+        last_end = index
+        last_slots = slots
+    return total
+
+def best_value(values:list, max_slots:int, recovery_slots:int, used_slots:int, on_slots:int) -> float:
+    best = 0.0
+    for mask in range(1 << len(values)):
+        off_slots = [index for index in range(len(values)) if mask >> index & 1]
+        value = plan_value(values, off_slots, max_slots, recovery_slots, used_slots, on_slots)
+        if value is not None and value > best:
+            best = value
+    return best
+
+def check(checks:int, rng:random.Random) -> int:
+    failed = 0
+    for _ in range(checks):
+        values = [round(rng.uniform(0, 3), 2) for _ in range(rng.randint(2, 10))]
+        max_slots = rng.randint(1, 4)
+        recovery_slots = rng.randint(0, 4)
+        used_slots = rng.randint(0, max_slots)
+        on_slots = rng.randint(0, 3) if used_slots > 0 else 0
+
+        off_slots = plan_save_slots(values = values,
+                                    index_start = 0,
+                                    pricedrop = PRICEDROP,
+                                    increase_per_slot = INCREASE_PER_SLOT,
+                                    max_slots = max_slots,
+                                    recovery_slots = recovery_slots,
+                                    used_slots = used_slots,
+                                    on_slots = on_slots)
+        value = plan_value(values, off_slots, max_slots, recovery_slots, used_slots, on_slots)
+        best = best_value(values, max_slots, recovery_slots, used_slots, on_slots)
+        if (
+            value is None
+            or abs(value - best) > 1e-9
+        ):
+            failed += 1
+            print(f"values {values} max_slots {max_slots} recovery_slots {recovery_slots} used_slots {used_slots} "
+                  f"on_slots {on_slots}: planned {off_slots} avoids {value}, best avoids {best}")
+    print(f"{checks} checks, {failed} failed")
+    return failed
+
+
+if __name__ == '__main__':
+    sys.exit(1 if check(checks = int(sys.argv[1]) if len(sys.argv) > 1 else 600, rng = random.Random(1)) else 0)
@@ -0,0 +1,79 @@
+""" Compares speed and avoided cost of the heuristic and optimal save hour planners
+
+    Usage: python tools/compare_save_planners.py [days]
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import datetime
+import random
+import sys
+import time
+
+from offline_engine import create_engine, price_day
+from save_planner import avoided_cost
+
+
+SETTINGS = [
+    dict(pricedrop = 0.08, max_continuous_hours = 2, on_for_minimum = 6, pricedifference_increase = 1.07),
+    dict(pricedrop = 0.15, max_continuous_hours = 4, on_for_minimum = 8, pricedifference_increase = 1.05),
+    dict(pricedrop = 0.3, max_continuous_hours = 12, on_for_minimum = 6, pricedifference_increase = 1.1),
+]
+
+
+def off_slots(engine, peaks) -> list:
+    slots:list = []
+    for peak in peaks:
+        slots.extend(range(engine.slots.index_from(peak.start), engine.slots.index_from(peak.end)))
+    return slots
+
+def compare(days:int, rng:random.Random) -> None:
+    totals = {planner: {'seconds': 0.0, 'saved': 0.0, 'hours': 0.0} for planner in ('heuristic', 'optimal')}
+    calls = 0
+    optimal_better = 0
+    heuristic_better = 0
+
+    for _ in range(days):
+        day = datetime.date(2026, 1, 1) + datetime.timedelta(days = rng.randint(0, 364))
+        minutes = rng.choice((15, 60))
+        kind = rng.choice(('random', 'peaks', 'negative'))
+        today = price_day(day, minutes = minutes, kind = kind, rng = rng)
+        tomorrow = price_day(day + datetime.timedelta(days = 1), minutes = minutes, kind = kind, rng = rng)
+        now = datetime.datetime.combine(day, datetime.time(rng.randint(13, 23), rng.randint(0, 59)),
+                                        tzinfo = today[0]['start'].tzinfo)
+        engine = create_engine(now = now, todays_prices = today, tomorrows_prices = tomorrow)
+        index_now = engine.slots.index_from(engine._hour_now())
+
+        for settings in SETTINGS:
+            saved = {}
+            for planner in ('heuristic', 'optimal'):
+                started = time.perf_counter()
+                peaks = engine.find_times_to_save(reset_continuous_hours = False,
+                                                  previous_save_hours = [],
+                                                  planner = planner,
+                                                  **settings)
+                totals[planner]['seconds'] += time.perf_counter() - started
+                slots = [index for index in off_slots(engine, peaks) if index >= index_now]
+                saved[planner] = avoided_cost(engine.slots.values, slots) * engine.slots.hours_per_slot()
+                totals[planner]['saved'] += saved[planner]
+                totals[planner]['hours'] += len(slots) * engine.slots.hours_per_slot()
+            calls += 1
+            if saved['optimal'] > saved['heuristic'] + 1e-9:
+                optimal_better += 1
+            elif saved['heuristic'] > saved['optimal'] + 1e-9:
+                heuristic_better += 1
+
+    print(f"{calls} plans on {days} generated days")
+    for planner, total in totals.items():
+        print(
+            f"{planner:>9}: {total['seconds'] / calls * 1000:7.2f} ms per call, "
+            f"avoided cost {total['saved'] / calls:7.3f} per kW load, "
+            f"{total['hours'] / calls:5.1f} hours off per plan"
+        )
+    print(f"optimal saved more in {optimal_better} plans, heuristic in {heuristic_better}")
+    print("Avoided cost moves consumption in each off period to the slot where it ends. The heuristic may break "
+          "the recovery rule the optimal planner keeps, so it can score higher on some plans.")
+
+
+if __name__ == '__main__':
+    compare(days = int(sys.argv[1]) if len(sys.argv) > 1 else 100, rng = random.Random(1))
@@ -0,0 +1,147 @@
+""" Measures refresh time and peak memory of reading prices from each source
+
+    Usage: python tools/ingestion_report.py [refreshes]
+
+    Feeds generated prices for today and tomorrow with 15 minute slots through the elspot,
+    Home Assistant Nordpool integration and fixed price paths, and checks that the raw
+    prices given to the app are left unchanged. Refresh is the whole update including
+    cheapest windows and notifications, read is only reading prices and adding taxes.
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import copy
+import datetime
+import random
+import sys
+import time
+import tracemalloc
+
+from offline_engine import create_engine, price_day
+from price_ingest import spot_records, integration_records
+
+
+ENTITY = 'sensor.nordpool_kwh_no5_nok_3_10_025'
+
+
+class RecordedSpotPrices:
+    """ Stands in for elspot.Prices, answering with prepared payloads in price per MWh and UTC times. """
+
+    def __init__(self, area:str, today:list, tomorrow:list):
+        self.area = area
+        self.payloads = {'today': self._payload(today), 'tomorrow': self._payload(tomorrow)}
+
+    def _payload(self, prices:list) -> dict:
+        return {'areas': {self.area: {'values': [{
+            'start': item['start'].astimezone(datetime.timezone.utc),
+            'end': item['end'].astimezone(datetime.timezone.utc),
+            'value': round(item['value'] * 1000, 2),
+        } for item in prices]}}}
+
+    def fetch(self, end_date = None, areas = None, resolution = None) -> dict:
+        return self.payloads['today' if end_date is not None else 'tomorrow']
+
+
+def integration_attributes(today:list, tomorrow:list) -> dict:
+    """ Attributes like the Home Assistant Nordpool integration with times as ISO strings. """
+
+    def raw(prices):
+        return [{
+            'start': item['start'].astimezone(datetime.timezone.utc).isoformat(),
+            'end': item['end'].astimezone(datetime.timezone.utc).isoformat(),
+            'value': item['value'],
+        } for item in prices]
+
+    return {'currency': 'NOK', 'raw_today': raw(today), 'raw_tomorrow': raw(tomorrow), 'tomorrow_valid': True}
+
+def timed(prepare, call, repeats:int) -> tuple:
+    """ Returns p50 seconds over repeats and peak traced bytes of one call. """
+
+    seconds:list = []
+    for _ in range(repeats):
+        prepare()
+        started = time.perf_counter()
+        call()
+        seconds.append(time.perf_counter() - started)
+
+    prepare()
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sorted(seconds)[len(seconds) // 2], peak
+
+def measure(name:str, engine, prepare, refresh, read, check, refreshes:int) -> None:
+    refresh_seconds, refresh_peak = timed(prepare = prepare, call = refresh, repeats = refreshes)
+    read_seconds, read_peak = timed(prepare = prepare, call = read, repeats = refreshes)
+    print(f"{name:<22} {refresh_seconds * 1000:8.2f} {refresh_peak / 1024:8.0f} {read_seconds * 1000:8.2f} "
+          f"{read_peak / 1024:8.0f} {len(engine.elpricestoday):6} {'no' if check() else 'YES':>11}")
+
+def read_prices(engine, today, tomorrow) -> None:
+    """ Reads and adds taxes to today and tomorrow given as records, like a refresh does. """
+
+    now = engine.ADapi.datetime(aware=True)
+    for records, day in ((today, 0), (tomorrow, 1)):
+        engine._doCalculationPricesInclVat(
+            nordpool_prices = records,
+            beforesix = now.replace(hour = 6, minute = 0) + datetime.timedelta(days = day),
+            aftertwentytwo = now.replace(hour = 22, minute = 0) + datetime.timedelta(days = day),
+            isNotWorkday = False
+        )
+
+def report(refreshes:int, rng:random.Random) -> None:
+    day = datetime.date(2026, 1, 15)
+    today = price_day(day, minutes = 15, kind = 'random', rng = rng)
+    tomorrow = price_day(day + datetime.timedelta(days = 1), minutes = 15, kind = 'random', rng = rng)
+    now = datetime.datetime.combine(day, datetime.time(14, 10), tzinfo = today[0]['start'].tzinfo)
+
+    print(f"{'':<22} {'refresh':>17} {'read':>17}")
+    print(f"{'source':<22} {'p50 ms':>8} {'peak kB':>8} {'p50 ms':>8} {'peak kB':>8} {'slots':>6} {'raw changed':>11}")
+
+    engine = create_engine(now = now, args = {'fixedprice': 1.0, 'resolution': 15})
+    measure('fixedprice', engine,
+            prepare = lambda: None,
+            refresh = lambda: engine._create_daily_prices_with_taxes(price = 1.0, tomorrow = True),
+            read = lambda: read_prices(engine,
+                                       today = engine._fixed_price_records(today = True, price = 1.0),
+                                       tomorrow = engine._fixed_price_records(today = False, price = 1.0)),
+            check = lambda: True,
+            refreshes = refreshes)
+
+    engine = create_engine(now = now)
+    engine.pricearea = 'NO5'
+    spot = RecordedSpotPrices(area = 'NO5', today = today, tomorrow = tomorrow)
+    pristine = copy.deepcopy(spot.payloads)
+    engine.prices_spot = spot
+
+    def prepare_spot():
+        spot.payloads = copy.deepcopy(pristine)
+
+    measure('elspot', engine,
+            prepare = prepare_spot,
+            refresh = lambda: engine._fetchNordpoolSpotPrices(0),
+            read = lambda: read_prices(engine,
+                                       today = spot_records(spot.payloads['today']['areas']['NO5']['values'], engine.VAT, now.tzinfo),
+                                       tomorrow = spot_records(spot.payloads['tomorrow']['areas']['NO5']['values'], engine.VAT, now.tzinfo)),
+            check = lambda: spot.payloads == pristine,
+            refreshes = refreshes)
+
+    engine = create_engine(now = now)
+    engine.nordpool_prices = ENTITY
+    attributes = integration_attributes(today = today, tomorrow = tomorrow)
+
+    def prepare_integration():
+        engine.offline_ad.states[ENTITY] = {'state': today[0]['value'], 'attributes': copy.deepcopy(attributes)}
+
+    measure('nordpool integration', engine,
+            prepare = prepare_integration,
+            refresh = lambda: engine._fetchNordpoolPrices(0),
+            read = lambda: read_prices(engine,
+                                       today = integration_records(attributes['raw_today'], engine.ADapi.convert_utc),
+                                       tomorrow = integration_records(attributes['raw_tomorrow'], engine.ADapi.convert_utc)),
+            check = lambda: engine.offline_ad.states[ENTITY]['attributes'] == attributes,
+            refreshes = refreshes)
+
+
+if __name__ == '__main__':
+    report(refreshes = int(sys.argv[1]) if len(sys.argv) > 1 else 50, rng = random.Random(1))
@@ -0,0 +1,177 @@
+""" Load test with many consumer threads calling the engine while prices are refreshed
+
+    Usage: python tools/load_test.py [--threads 24] [--seconds 10] [--refresh 0.5]
+                                     [--mix price_now=6,lowest=3,cheapest=2,save=1,spend=1,below=1]
+
+    Every call is compared with the answer for each price set calculated before the run, with the
+    same clock. A read matching none of them mixed two price sets and is counted as inconsistent.
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import argparse
+import collections
+import datetime
+import random
+import threading
+import time
+import traceback
+
+from offline_engine import create_engine, price_day
+from price_ingest import price_records
+
+
+CALLS = {
+    'price_now': lambda engine: engine.electricity_price_now(),
+    'lowest': lambda engine: engine.get_lowest_prices(checkitem = 1, hours = 6, min_change = 0.1),
+    'cheapest': lambda engine: engine.get_Continuous_Cheapest_Time(hoursTotal = 3,
+                                                                    calculateBeforeNextDayPrices = False,
+                                                                    finishByHour = 7),
+    'save': lambda engine: engine.find_times_to_save(pricedrop = 0.08,
+                                                     max_continuous_hours = 4,
+                                                     on_for_minimum = 6,
+                                                     pricedifference_increase = 1.07,
+                                                     reset_continuous_hours = False,
+                                                     previous_save_hours = []),
+    'spend': lambda engine: engine.find_times_to_spend(priceincrease = 0.5),
+    'below': lambda engine: engine.find_next_time_price_below(price = 1.0),
+}
+
+DEFAULT_MIX = 'price_now=6,lowest=3,cheapest=2,save=1,spend=1,below=1'
+
+
+def comparable(result):
+    """ Returns result as a value that compares equal for equal answers. """
+
+    if isinstance(result, list):
+        return tuple(comparable(item) for item in result)
+    if hasattr(result, 'start') and hasattr(result, 'end'):
+        return (result.start, result.end, getattr(result, 'value', None))
+    return result
+
+def percentile(latencies:list, part:float) -> float:
+    if not latencies:
+        return 0.0
+    ordered = sorted(latencies)
+    return ordered[min(int(len(ordered) * part), len(ordered) - 1)] * 1000
+
+def parse_mix(mix:str) -> dict:
+    weights:dict = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in CALLS:
+            raise SystemExit(f"Unknown call {name.strip()}, use one of {', '.join(CALLS)}")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+def price_sets(day:datetime.date, rng:random.Random) -> list:
+    """ Today only as before the 13:00 refresh, and today with tomorrow as after it. """
+
+    today = price_day(day, minutes = 15, kind = 'peaks', rng = rng)
+    tomorrow = price_day(day + datetime.timedelta(days = 1), minutes = 15, kind = 'peaks', rng = rng)
+    return [(today, []), (today, tomorrow)]
+
+def run(threads:int, seconds:float, refresh:float, weights:dict, seed:int = 1) -> None:
+    rng = random.Random(seed)
+    day = datetime.date(2026, 1, 15)
+    sets = price_sets(day, rng)
+    now = datetime.datetime.combine(day, datetime.time(13, 0, 5), tzinfo = sets[0][0][0]['start'].tzinfo)
+    engine = create_engine(now = now, todays_prices = sets[0][0], tomorrows_prices = sets[0][1])
+
+    # Answers for every price set, calculated before the run.
+    expected = {name: set() for name in CALLS}
+    for today, tomorrow in sets:
+        engine._calculatePrices(nordpool_todays_prices = price_records(today),
+                                nordpool_tomorrow_prices = price_records(tomorrow))
+        for name, call in CALLS.items():
+            expected[name].add(comparable(call(engine)))
+
+    latencies = {name: [] for name in weights}
+    refresh_latencies:list = []
+    exceptions:collections.Counter = collections.Counter()
+    exception_samples:dict = {}
+    inconsistent:collections.Counter = collections.Counter()
+    inconsistent_samples:dict = {}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def consumer(thread_seed:int):
+        thread_rng = random.Random(thread_seed)
+        names = list(weights)
+        measured = {name: [] for name in weights}
+        while not stop.is_set():
+            name = thread_rng.choices(names, weights = [weights[name] for name in names])[0]
+            started = time.perf_counter()
+            try:
+                result = CALLS[name](engine)
+            except Exception as e:
+                key = f"{name}: {type(e).__name__}"
+                with lock:
+                    exceptions[key] += 1
+                    exception_samples.setdefault(key, traceback.format_exc())
+                continue
+            measured[name].append(time.perf_counter() - started)
+            if comparable(result) not in expected[name]:
+                with lock:
+                    inconsistent[name] += 1
+                    inconsistent_samples.setdefault(name, result)
+        with lock:
+            for name, values in measured.items():
+                latencies[name].extend(values)
+
+    def refresher():
+        generation = 0
+        while not stop.wait(refresh):
+            generation += 1
+            today, tomorrow = sets[generation % len(sets)]
+            started = time.perf_counter()
+            try:
+                engine._calculatePrices(nordpool_todays_prices = price_records(today),
+                                        nordpool_tomorrow_prices = price_records(tomorrow))
+            except Exception as e:
+                key = f"refresh: {type(e).__name__}"
+                with lock:
+                    exceptions[key] += 1
+                    exception_samples.setdefault(key, traceback.format_exc())
+                continue
+            refresh_latencies.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target = consumer, args = (seed * 1000 + number,)) for number in range(threads)]
+    workers.append(threading.Thread(target = refresher))
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(values) for values in latencies.values())
+    print(f"{threads} threads for {elapsed:.1f} s, {len(refresh_latencies)} refreshes "
+          f"(p50 {percentile(refresh_latencies, 0.5):.1f} ms, p99 {percentile(refresh_latencies, 0.99):.1f} ms)")
+    print(f"{total} calls, {total / elapsed:.0f} calls/s, {sum(exceptions.values())} exceptions, "
+          f"{sum(inconsistent.values())} inconsistent reads\n")
+    print(f"{'call':<10} {'calls':>8} {'p50 ms':>8} {'p99 ms':>8} {'inconsistent':>13}")
+    for name, values in latencies.items():
+        print(f"{name:<10} {len(values):8} {percentile(values, 0.5):8.3f} {percentile(values, 0.99):8.3f} "
+              f"{inconsistent[name]:13}")
+    for key, count in exceptions.items():
+        print(f"\n{count} x {key}\n{exception_samples[key]}")
+    for name, result in inconsistent_samples.items():
+        print(f"\nInconsistent {name}: {result}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Load test ElectricalPriceCalc from many threads with price refreshes.')
+    parser.add_argument('--threads', type = int, default = 24)
+    parser.add_argument('--seconds', type = float, default = 10)
+    parser.add_argument('--refresh', type = float, default = 0.5, help = 'seconds between price refreshes')
+    parser.add_argument('--mix', default = DEFAULT_MIX, help = 'call=weight pairs, calls: ' + ', '.join(CALLS))
+    parser.add_argument('--seed', type = int, default = 1)
+    arguments = parser.parse_args()
+    run(threads = arguments.threads,
+        seconds = arguments.seconds,
+        refresh = arguments.refresh,
+        weights = parse_mix(arguments.mix),
+        seed = arguments.seed)
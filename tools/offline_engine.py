@@ -0,0 +1,176 @@
+""" Runs ElectricalPriceCalc outside AppDaemon with a stubbed clock and generated prices
+
+    Needs the packages in requirements.txt and appdaemon installed, but no running
+    AppDaemon or Home Assistant and no network.
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import datetime
+import os
+import random
+import sys
+import threading
+from zoneinfo import ZoneInfo
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'apps', 'ElectricalPriceCalc')
+sys.path.insert(0, APP_DIR)
+
+from electricalPriceCalc import ElectricalPriceCalc
+from price_ingest import price_records
+
+
+TIME_ZONE = 'Europe/Oslo'
+
+DEFAULT_ARGS = {
+    'country_code': 'NO',
+    'fixedprice': 1.0,
+    'VAT': 1.25,
+    'currency': 'NOK',
+    'daytax': 0.4782,
+    'nighttax': 0.3602,
+    'additional_tax': 0.0295,
+    'power_support_above': 0.9125,
+    'support_amount': 0.9,
+}
+
+
+class OfflineADapi:
+    """ The part of the AppDaemon API ElectricalPriceCalc uses, with a clock set by the caller.
+        Timers are recorded but never run. """
+
+    def __init__(self, now:datetime.datetime, time_zone:str = TIME_ZONE):
+        self.now = now
+        self.time_zone = time_zone
+        self.logs:list = []
+        self.events:list = []
+        self.states:dict = {}
+        self.timers:list = []
+        self.apps:dict = {}
+        self._lock = threading.Lock()
+
+    def datetime(self, aware = True) -> datetime.datetime:
+        return self.now
+
+    def get_timezone(self) -> str:
+        return self.time_zone
+
+    def now_is_between(self, start_time:str, end_time:str) -> bool:
+        now = self.now.time()
+        return datetime.time.fromisoformat(start_time) <= now <= datetime.time.fromisoformat(end_time)
+
+    def parse_datetime(self, time_str:str, today = True, aware = True):
+        return datetime.datetime.combine(self.now.date(), datetime.time.fromisoformat(time_str),
+                                         tzinfo = ZoneInfo(self.time_zone))
+
+    def convert_utc(self, utc:str):
+        return datetime.datetime.fromisoformat(utc).astimezone(ZoneInfo(self.time_zone))
+
+    def get_app(self, name:str):
+        return self.apps.get(name)
+
+    def log(self, msg:str, level:str = 'INFO') -> None:
+        with self._lock:
+            self.logs.append((level, msg))
+
+    def _add_timer(self, callback, when, kwargs) -> int:
+        with self._lock:
+            self.timers.append((callback, when, kwargs))
+            return len(self.timers)
+
+    def run_in(self, callback, delay, **kwargs) -> int:
+        return self._add_timer(callback, delay, kwargs)
+
+    def run_at(self, callback, start, **kwargs) -> int:
+        return self._add_timer(callback, start, kwargs)
+
+    def run_daily(self, callback, start, **kwargs) -> int:
+        return self._add_timer(callback, start, kwargs)
+
+    def timer_running(self, handle) -> bool:
+        return False
+
+    def cancel_timer(self, handle) -> None:
+        pass
+
+    def fire_event(self, event:str, **kwargs) -> None:
+        with self._lock:
+            self.events.append((event, kwargs))
+
+    def get_state(self, entity_id = None, attribute = None, **kwargs):
+        state = self.states.get(entity_id, {})
+        if attribute is None:
+            return state.get('state')
+        return state.get('attributes', {}).get(attribute)
+
+    def set_state(self, entity_id:str, **kwargs) -> None:
+        with self._lock:
+            self.states[entity_id] = kwargs
+
+
+def local_day(day:datetime.date, time_zone:str = TIME_ZONE) -> tuple:
+    """ Returns start and end of day in time_zone. """
+
+    tz = ZoneInfo(time_zone)
+    return (datetime.datetime.combine(day, datetime.time(0), tzinfo = tz),
+            datetime.datetime.combine(day + datetime.timedelta(days = 1), datetime.time(0), tzinfo = tz))
+
+def price_day(day:datetime.date,
+              minutes:int = 15,
+              kind:str = 'random',
+              rng:random.Random = None,
+              time_zone:str = TIME_ZONE
+              ) -> list:
+    """ Returns Nordpool like price dicts in kWh price without VAT for day.
+        kind is 'random', 'peaks' with morning and evening peaks, 'negative' or 'flat'. """
+
+    rng = rng or random.Random()
+    start_day, end_day = local_day(day, time_zone)
+    tz = start_day.tzinfo
+    step = datetime.timedelta(minutes = minutes)
+    cur = start_day.astimezone(datetime.timezone.utc)
+    end_utc = end_day.astimezone(datetime.timezone.utc)
+    flat_price = round(rng.uniform(0.3, 1.5), 3)
+
+    prices:list = []
+    while cur < end_utc:
+        hour = cur.astimezone(tz).hour
+        if kind == 'flat':
+            value = flat_price
+        elif kind == 'negative':
+            value = round(rng.uniform(-0.4, 0.6) if 9 <= hour < 17 else rng.uniform(0.0, 1.2), 3)
+        elif kind == 'peaks':
+            peak = 1.2 if hour in (7, 8, 9, 17, 18, 19) else 0.0
+            value = round(rng.uniform(0.2, 0.8) + peak + rng.gauss(0, 0.05), 3)
+        else:
+            value = round(rng.uniform(0.0, 2.5), 3)
+        prices.append({
+            'start': cur.astimezone(tz),
+            'end': (cur + step).astimezone(tz),
+            'value': value,
+        })
+        cur += step
+    return prices
+
+def create_engine(now:datetime.datetime,
+                  todays_prices:list = None,
+                  tomorrows_prices:list = None,
+                  args:dict = None,
+                  engine_class = ElectricalPriceCalc):
+    """ Creates and initializes an engine_class app on OfflineADapi. Prices are given as
+        kWh price dicts without taxes, like the prices read from Nordpool. """
+
+    offline_class = type('Offline' + engine_class.__name__, (engine_class,), {
+        'get_ad_api': lambda self: self.offline_ad,
+    })
+    engine = offline_class.__new__(offline_class)
+    engine.offline_ad = OfflineADapi(now = now)
+    engine.name = 'electricalPriceCalc'
+    engine.config = {}
+    engine.args = dict(DEFAULT_ARGS, **(args or {}))
+    engine.initialize()
+
+    if todays_prices is not None:
+        engine._calculatePrices(nordpool_todays_prices = price_records(todays_prices),
+                                nordpool_tomorrow_prices = price_records(tomorrows_prices or []))
+    return engine
@@ -0,0 +1,165 @@
+""" Measures latency and throughput of the query server with local clients
+
+    Usage: python tools/query_server_bench.py [clients] [requests per client] [--unix] [--sync-wrapped]
+
+    --sync-wrapped wraps the offline AppDaemon API like AppDaemon's sync_wrapper: called from a
+    thread with an event loop it returns a Task, else it waits for the call on AppDaemon's loop.
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import asyncio
+import datetime
+import functools
+import http.client
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from offline_engine import create_engine, price_day
+from query_server import QueryServer
+
+
+QUERIES = [
+    '/prices',
+    '/price',
+    '/cheapest?hours=3&finish_by_hour=7',
+    '/lowest?hours=6',
+    '/save?pricedrop=0.08&max_continuous_hours=4&on_for_minimum=6&pricedifference_increase=1.07',
+    '/save?pricedrop=0.08&max_continuous_hours=4&on_for_minimum=6&pricedifference_increase=1.07&session=bench',
+    '/spend?priceincrease=0.5',
+]
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path:str):
+        super().__init__('localhost')
+        self.unix_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.unix_path)
+
+
+def sync_wrap(adapi, names:tuple = ('datetime', 'now_is_between', 'parse_datetime', 'get_state', 'set_state')) -> None:
+    """ Replaces methods of adapi with wrappers working like AppDaemon's sync_wrapper on a loop in its own thread. """
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target = loop.run_forever, name = 'AppDaemon loop', daemon = True).start()
+
+    def wrap(method):
+        async def coroutine(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                asyncio.get_event_loop()
+            except RuntimeError:
+                return asyncio.run_coroutine_threadsafe(coroutine(*args, **kwargs), loop).result()
+            return asyncio.ensure_future(coroutine(*args, **kwargs))
+        return wrapper
+
+    for name in names:
+        setattr(adapi, name, wrap(getattr(adapi, name)))
+
+def percentile(latencies:list, part:float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(int(len(ordered) * part), len(ordered) - 1)] * 1000
+
+def run_clients(server:QueryServer, clients:int, requests:int, keep_alive:bool) -> dict:
+    """ Runs clients in threads, each sending requests from QUERIES. Returns latencies per query. """
+
+    latencies = {query: [] for query in QUERIES}
+    sizes:dict = {}
+    errors:list = []
+    lock = threading.Lock()
+
+    def connect():
+        if server.path:
+            return UnixHTTPConnection(server.path)
+        return http.client.HTTPConnection(server.host, server.port)
+
+    def client(seed:int):
+        rng = random.Random(seed)
+        measured = {query: [] for query in QUERIES}
+        connection = connect()
+        for _ in range(requests):
+            query = rng.choice(QUERIES)
+            started = time.perf_counter()
+            try:
+                if not keep_alive:
+                    connection = connect()
+                connection.request('GET', query, headers = {} if keep_alive else {'Connection': 'close'})
+                response = connection.getresponse()
+                body = response.read()
+                if response.status != 200:
+                    raise RuntimeError(f"{response.status} {body[:100]}")
+            except Exception as e:
+                with lock:
+                    errors.append(f"{query}: {e}")
+                connection.close()
+                connection = connect()
+                continue
+            measured[query].append(time.perf_counter() - started)
+            sizes[query] = len(body)
+            if not keep_alive:
+                connection.close()
+        connection.close()
+        with lock:
+            for query, values in measured.items():
+                latencies[query].extend(values)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target = client, args = (seed,)) for seed in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'latencies': latencies, 'sizes': sizes, 'errors': errors, 'seconds': time.perf_counter() - started}
+
+def report(title:str, result:dict) -> None:
+    total = sum(len(values) for values in result['latencies'].values())
+    print(f"\n{title}: {total} requests in {result['seconds']:.2f} s, {total / result['seconds']:.0f} requests/s, "
+          f"{len(result['errors'])} errors")
+    width = max(len(query) for query in QUERIES)
+    print(f"{'query':<{width}} {'p50 ms':>8} {'p99 ms':>8} {'bytes':>7}")
+    for query, values in result['latencies'].items():
+        if values:
+            print(f"{query:<{width}} {percentile(values, 0.5):8.2f} {percentile(values, 0.99):8.2f} "
+                  f"{result['sizes'].get(query, 0):7}")
+    for error in result['errors'][:5]:
+        print(f"  {error}")
+
+
+if __name__ == '__main__':
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--')]
+    clients = int(arguments[0]) if len(arguments) > 0 else 4
+    requests = int(arguments[1]) if len(arguments) > 1 else 500
+
+    rng = random.Random(1)
+    day = datetime.date(2026, 1, 15)
+    today = price_day(day, minutes = 15, kind = 'peaks', rng = rng)
+    tomorrow = price_day(day + datetime.timedelta(days = 1), minutes = 15, kind = 'peaks', rng = rng)
+    now = datetime.datetime.combine(day, datetime.time(14, 10), tzinfo = today[0]['start'].tzinfo)
+    engine = create_engine(now = now, todays_prices = today, tomorrows_prices = tomorrow)
+    if '--sync-wrapped' in sys.argv:
+        sync_wrap(engine.ADapi)
+
+    if '--unix' in sys.argv:
+        server = QueryServer(app = engine, path = os.path.join(tempfile.mkdtemp(), 'electricalpricecalc.sock'))
+    else:
+        server = QueryServer(app = engine, port = 0)
+    server.start()
+    print(f"Query server on {server.path or f'{server.host}:{server.port}'}, {clients} clients, "
+          f"{len(engine.elpricestoday)} price slots{', sync wrapped API' if '--sync-wrapped' in sys.argv else ''}")
+    try:
+        report('Kept alive connections', run_clients(server, clients = clients, requests = requests, keep_alive = True))
+        report('New connection per request', run_clients(server, clients = clients, requests = requests // 5, keep_alive = False))
+    finally:
+        server.stop()
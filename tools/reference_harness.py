@@ -0,0 +1,242 @@
+""" Runs the reference and optimized engines side by side and reports where answers differ
+
+    Usage: python tools/reference_harness.py [--days 60] [--times 6] [--seed 1] [--recorded days.json] [--record-dst]
+
+    Generates random, peak, negative and flat fixed price days with 15 and 60 minute slots,
+    with and without tomorrow's prices, days with daylight saving changes and a day without
+    published prices, as at startup or after a failed fetch. Each day is
+    queried at several clock times. Recorded days are read from a JSON list of
+    {"today": [...], "tomorrow": [...]} with start, end as ISO times and value in kWh price without taxes.
+
+    The reference converts hours to slots by slots per day, so it differs by design on days
+    with daylight saving changes. These are reported separately and counted per query. The counts are
+    compared with the counts recorded in reference_harness_dst.json for the same arguments, and
+    --record-dst records them. Exits with status 1 if answers differ on other days or the count of
+    differing answers on daylight saving days changes.
+
+    @Pythm / https://github.com/Pythm
+"""
+
+import argparse
+import collections
+import datetime
+import json
+import os
+import random
+import sys
+import time
+
+from offline_engine import create_engine, local_day, price_day
+from reference_engine import ReferenceElectricalPriceCalc
+
+
+KINDS = ('random', 'peaks', 'negative', 'flat')
+SAVE_SETTINGS = [
+    dict(pricedrop = 0.1, max_continuous_hours = 6, on_for_minimum = 6, pricedifference_increase = 1.07, reset_continuous_hours = False),
+    dict(pricedrop = 0.3, max_continuous_hours = 12, on_for_minimum = 4, pricedifference_increase = 1.03, reset_continuous_hours = True),
+    dict(pricedrop = 0.05, max_continuous_hours = 3, on_for_minimum = 8, pricedifference_increase = 1.1, reset_continuous_hours = False),
+]
+DST_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reference_harness_dst.json')
+
+
+def dst_days(year:int) -> list:
+    """ Days with daylight saving changes in Europe, last Sunday of March and October. """
+
+    days:list = []
+    for month in (3, 10):
+        day = datetime.date(year, month, 31)
+        days.append(day - datetime.timedelta(days = (day.weekday() + 1) % 7))
+    return days
+
+def generated_days(count:int, rng:random.Random) -> list:
+    """ Returns (label, is_dst, today, tomorrow) for count random days and the days around daylight saving changes. """
+
+    days:list = []
+    for day in dst_days(2026):
+        for first in (day - datetime.timedelta(days = 1), day):
+            for minutes in (15, 60):
+                kind = rng.choice(KINDS)
+                days.append((f"{first} {minutes} min {kind}", True,
+                             price_day(first, minutes = minutes, kind = kind, rng = rng),
+                             price_day(first + datetime.timedelta(days = 1), minutes = minutes, kind = kind, rng = rng)))
+    excluded = set()
+    for day in dst_days(2026):
+        excluded.update((day - datetime.timedelta(days = 1), day))
+    while len(days) < count + 8:
+        day = datetime.date(2026, 1, 1) + datetime.timedelta(days = rng.randint(0, 364))
+        if day in excluded:
+            continue
+        minutes = rng.choice((15, 60))
+        kind = KINDS[len(days) % len(KINDS)]
+        tomorrow = (price_day(day + datetime.timedelta(days = 1), minutes = minutes, kind = kind, rng = rng)
+                    if rng.random() < 0.6 else [])
+        days.append((f"{day} {minutes} min {kind}{'' if tomorrow else ' today only'}", False,
+                     price_day(day, minutes = minutes, kind = kind, rng = rng), tomorrow))
+    days.append(("no prices", False, [], []))
+    return days
+
+def recorded_days(path:str) -> list:
+    with open(path) as file:
+        recorded = json.load(file)
+
+    def prices(items):
+        return [{
+            'start': datetime.datetime.fromisoformat(item['start']),
+            'end': datetime.datetime.fromisoformat(item['end']),
+            'value': float(item['value']),
+        } for item in items]
+
+    days:list = []
+    for number, day in enumerate(recorded):
+        today = prices(day['today'])
+        length = (today[-1]['end'].timestamp() - today[0]['start'].timestamp()) / 3600 if today else 24
+        days.append((f"recorded {number} {today[0]['start'].date() if today else ''}", length != 24,
+                     today, prices(day.get('tomorrow', []))))
+    return days
+
+def queries(engine, rng:random.Random) -> list:
+    """ Returns (name, arguments, call) for queries at the engine's clock time. """
+
+    calls:list = [('electricity_price_now', {}, lambda engine: engine.electricity_price_now())]
+    for hours in (1, 2, 3.5, 6):
+        for finish in (rng.choice((5, 7)), 16):
+            for before_next_day in (False, True):
+                arguments = dict(hoursTotal = hours, calculateBeforeNextDayPrices = before_next_day, finishByHour = finish)
+                calls.append(('get_Continuous_Cheapest_Time', arguments,
+                              lambda engine, arguments = arguments: engine.get_Continuous_Cheapest_Time(**arguments)))
+    for checkitem in (0, 10, max(len(engine.elpricestoday) - 1, 0)):
+        for min_change in (None, 0.1):
+            arguments = dict(checkitem = checkitem, hours = rng.choice((3, 6)), min_change = min_change)
+            calls.append(('get_lowest_prices', arguments,
+                          lambda engine, arguments = arguments: engine.get_lowest_prices(**arguments)))
+    for priceincrease in (0.1, 0.4):
+        arguments = dict(priceincrease = priceincrease)
+        calls.append(('find_times_to_spend', arguments,
+                      lambda engine, arguments = arguments: engine.find_times_to_spend(**arguments)))
+    for settings in SAVE_SETTINGS:
+        calls.append(('find_times_to_save', settings,
+                      lambda engine, settings = settings: engine.find_times_to_save(previous_save_hours = [], **settings)))
+    return calls
+
+def comparable(result):
+    if isinstance(result, (list, tuple)):
+        return tuple(comparable(item) for item in result)
+    if hasattr(result, 'start') and hasattr(result, 'end'):
+        return (result.start, result.end)
+    return result
+
+def run_query(engine, call) -> tuple:
+    started = time.perf_counter()
+    try:
+        result = comparable(call(engine))
+    except Exception as e:
+        result = e
+    return result, time.perf_counter() - started
+
+def compare(days:list, times:int, rng:random.Random, dst_baseline:dict = None) -> tuple:
+    """ Returns number of failures and count of differing answers on daylight saving days per query.
+        With dst_baseline, a count that differs from the recorded count is a failure. """
+
+    stats = collections.defaultdict(lambda: {'cases': 0, 'differ': 0, 'differ_dst': 0,
+                                             'reference_errors': 0, 'optimized_errors': 0,
+                                             'reference_seconds': 0.0, 'optimized_seconds': 0.0})
+    examples:list = []
+
+    for label, is_dst, today, tomorrow in days:
+        start = today[0]['start'] if today else local_day(datetime.date(2026, 1, 15))[0]
+        tz = start.tzinfo
+        day = start.date()
+        reference = optimized = None
+        for _ in range(times):
+            now = datetime.datetime.combine(day, datetime.time(rng.randint(0, 23), rng.randint(0, 59)), tzinfo = tz)
+            if reference is None:
+                reference = create_engine(now = now, todays_prices = today, tomorrows_prices = tomorrow,
+                                          engine_class = ReferenceElectricalPriceCalc)
+                optimized = create_engine(now = now, todays_prices = today, tomorrows_prices = tomorrow)
+            reference.offline_ad.now = now
+            optimized.offline_ad.now = now
+
+            for name, arguments, call in queries(optimized, rng):
+                expected, reference_seconds = run_query(reference, call)
+                answer, optimized_seconds = run_query(optimized, call)
+                stat = stats[name]
+                stat['cases'] += 1
+                stat['reference_seconds'] += reference_seconds
+                stat['optimized_seconds'] += optimized_seconds
+                if isinstance(expected, Exception):
+                    stat['reference_errors'] += 1
+                    continue
+                if isinstance(answer, Exception):
+                    stat['optimized_errors'] += 1
+                elif answer == expected:
+                    continue
+                elif is_dst:
+                    stat['differ_dst'] += 1
+                    continue
+                else:
+                    stat['differ'] += 1
+                if len(examples) < 10:
+                    examples.append((label, now, name, arguments, expected, answer))
+
+    print(f"{len(days)} days, {times} clock times per day\n")
+    print(f"{'query':<30} {'cases':>7} {'differ':>7} {'DST':>5} {'ref err':>8} {'opt err':>8} "
+          f"{'ref ms':>8} {'opt ms':>8} {'speedup':>8}")
+    failures = 0
+    for name, stat in stats.items():
+        reference_ms = stat['reference_seconds'] / stat['cases'] * 1000
+        optimized_ms = stat['optimized_seconds'] / stat['cases'] * 1000
+        print(f"{name:<30} {stat['cases']:7} {stat['differ']:7} {stat['differ_dst']:5} {stat['reference_errors']:8} "
+              f"{stat['optimized_errors']:8} {reference_ms:8.3f} {optimized_ms:8.3f} "
+              f"{reference_ms / optimized_ms if optimized_ms else 0:7.1f}x")
+        failures += stat['differ'] + stat['optimized_errors']
+    dst_counts:dict = {name: stat['differ_dst'] for name, stat in stats.items()}
+
+    print("\nDST counts answers that differ on days with daylight saving changes, where the reference counts "
+          "slots per day instead of by time. Reference errors are cases the reference cannot answer.")
+    if dst_baseline is None:
+        print("No DST counts are recorded for these arguments. Record them with --record-dst.")
+    else:
+        for name in sorted(set(dst_counts) | set(dst_baseline)):
+            if dst_counts.get(name, 0) != dst_baseline.get(name, 0):
+                failures += 1
+                print(f"DST count for {name} changed from recorded {dst_baseline.get(name, 0)} to {dst_counts.get(name, 0)}")
+    for label, now, name, arguments, expected, answer in examples:
+        print(f"\n{label} at {now.strftime('%H:%M')}: {name}({arguments})\n  reference: {expected}\n  optimized: {answer}")
+    return failures, dst_counts
+
+def baseline_key(arguments) -> str:
+    """ Returns the arguments that decide which days and queries are compared. """
+
+    if arguments.recorded:
+        return f"--times {arguments.times} --seed {arguments.seed} --recorded {os.path.basename(arguments.recorded)}"
+    return f"--days {arguments.days} --times {arguments.times} --seed {arguments.seed}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Compare reference and optimized ElectricalPriceCalc answers.')
+    parser.add_argument('--days', type = int, default = 60, help = 'random days in addition to days around daylight saving changes')
+    parser.add_argument('--times', type = int, default = 6, help = 'clock times per day')
+    parser.add_argument('--seed', type = int, default = 1)
+    parser.add_argument('--recorded', help = 'JSON file with recorded price days')
+    parser.add_argument('--record-dst', action = 'store_true', help = f"record DST counts in {os.path.basename(DST_BASELINE)}")
+    arguments = parser.parse_args()
+
+    baselines:dict = {}
+    if os.path.exists(DST_BASELINE):
+        with open(DST_BASELINE) as file:
+            baselines = json.load(file)
+    key = baseline_key(arguments)
+
+    rng = random.Random(arguments.seed)
+    days = recorded_days(arguments.recorded) if arguments.recorded else generated_days(arguments.days, rng)
+    failures, dst_counts = compare(days = days,
+                                   times = arguments.times,
+                                   rng = rng,
+                                   dst_baseline = None if arguments.record_dst else baselines.get(key))
+    if arguments.record_dst:
+        baselines[key] = dst_counts
+        with open(DST_BASELINE, 'w') as file:
+            json.dump(baselines, file, indent = 4, sort_keys = True)
+            file.write('\n')
+        print(f"Recorded DST counts for {key}")
+    sys.exit(1 if failures else 0)